@@ -132,6 +132,35 @@ const waitForParquetInSupabase = async ({
   throw new Error("Parquet not detected in Supabase yet. Check GitHub Actions logs.");
 };
 
+// /upload only queues the ingestion; poll GET /jobs/{id} until it finishes
+const waitForIngestionJob = async ({
+  jobId,
+  onProgress = () => {},
+  intervalMs = 1500,
+  timeoutMs = 600000, // 10 min
+}) => {
+  const start = Date.now();
+
+  while (Date.now() - start < timeoutMs) {
+    const res = await fetch(`https://sinai-nexus-backend.onrender.com/jobs/${jobId}`);
+    if (!res.ok) throw new Error(`ingestion status failed: ${res.status}`);
+
+    const job = await res.json();
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(`ingestion failed at ${job.error}`);
+
+    onProgress(job);
+    await sleep(intervalMs);
+  }
+
+  throw new Error("Ingestion is taking too long. The file may still appear later.");
+};
+
+const ingestionProgressMsg = (job) =>
+  job.stage
+    ? `Step: ${job.stage} (${Math.round(job.progress * 100)}% done)`
+    : "Waiting for a free ingestion worker...";
+
 
 
 
@@ -258,7 +287,12 @@ function AdminDashboard({ auth }) {
       
         setKbLoadingMsg("Parquet uploaded! Refreshing Knowledge Base...");
         setKbLoadingSubMsg(`Detected: ${found}. Updating the file list now...`);
-      
+
+        // Ask the backend to swap in the new scheduling dataset (no restart needed)
+        await fetch("https://sinai-nexus-backend.onrender.com/reload-dataset", {
+          method: "POST",
+        }).catch((e) => console.error("Dataset reload error:", e));
+
         await loadAllFiles();
       
         setAlert({
@@ -284,6 +318,12 @@ function AdminDashboard({ auth }) {
           const txt = await res.text().catch(() => "");
           throw new Error(`upload failed: ${txt || res.status}`);
         }
+
+        const { job_id } = await res.json();
+        await waitForIngestionJob({
+          jobId: job_id,
+          onProgress: (job) => setKbLoadingSubMsg(ingestionProgressMsg(job)),
+        });
   
         setAlert({
           open: true,
@@ -449,6 +489,12 @@ function AdminDashboard({ auth }) {
           const txt = await res.text().catch(() => "");
           throw new Error(`upload note failed: ${txt || res.status}`);
         }
+
+        const { job_id } = await res.json();
+        await waitForIngestionJob({
+          jobId: job_id,
+          onProgress: (job) => setKbLoadingSubMsg(ingestionProgressMsg(job)),
+        });
       }
   
       // Add to React state using real Supabase URL
@@ -487,6 +533,7 @@ function AdminDashboard({ auth }) {
     } finally {
       setKbLoading(false);
       setKbLoadingMsg("");
+      setKbLoadingSubMsg("");
     }
   };
   
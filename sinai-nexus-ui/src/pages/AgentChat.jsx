@@ -228,6 +228,45 @@ function AgentChat({ auth, hideNavbar = false }) {
     }
   };
 
+  // Document Q&A answers are streamed (Server-Sent Events): the source
+  // files arrive first, then the answer text as Gemini generates it.
+  // onUpdate({ text, sources }) is called on every event.
+  const streamRagAnswer = async (question, onUpdate) => {
+    const res = await fetch("https://sinai-nexus-backend.onrender.com/rag-chat-stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/x-www-form-urlencoded" },
+      body: new URLSearchParams({ query: question }),
+    });
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let text = "";
+    let sources = [];
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      const events = buffer.split("\n\n");
+      buffer = events.pop();
+      for (const raw of events) {
+        const event = raw.match(/^event: (.*)$/m)?.[1];
+        const data = raw.match(/^data: (.*)$/m)?.[1];
+        if (!event || !data) continue;
+        const payload = JSON.parse(data);
+        if (event === "sources") sources = payload.sources || [];
+        else if (event === "token") text += payload.text;
+        else if (event === "error" && !text) throw new Error(payload.error);
+        onUpdate({ text: text || "Thinking...", sources });
+      }
+    }
+    return { text: text.trim() || "No response available.", sources };
+  };
+
   const createNewChat = (chatMode) => {
     const newChat = {
       id: makeId(),
@@ -310,15 +349,29 @@ function AgentChat({ auth, hideNavbar = false }) {
     );
     setInput("");
 
+    const replaceLast = (botReply) =>
+      setChats((prev) =>
+        prev.map((chat) =>
+          chat.id === currentChat.id
+            ? { ...chat, messages: [...chat.messages.slice(0, -1), botReply] }
+            : chat
+        )
+      );
+
+    if (activeMode === "rag") {
+      try {
+        const { text, sources } = await streamRagAnswer(question, ({ text, sources }) =>
+          replaceLast({ sender: "bot", text, sources })
+        );
+        replaceLast({ sender: "bot", text, sources });
+        return;
+      } catch {
+        // Stream unavailable (older backend, proxy, network) → plain request
+      }
+    }
+
     const reply = await sendToBackend(question, activeMode);
-    const botReply = { sender: "bot", text: reply };
-    setChats((prev) =>
-      prev.map((chat) =>
-        chat.id === currentChat.id
-          ? { ...chat, messages: [...chat.messages.slice(0, -1), botReply] }
-          : chat
-      )
-    );
+    replaceLast({ sender: "bot", text: reply });
   };
 
   const stripMd = (t) => t.replace(/\*\*(.*?)\*\*/g, "$1");
@@ -555,6 +608,11 @@ function AgentChat({ auth, hideNavbar = false }) {
                   <ListItemText
                     primary={formatMessage(msg.text)}
                     primaryTypographyProps={{ component: "div" }}
+                    secondary={
+                      msg.sources?.length
+                        ? `Sources: ${msg.sources.map((p) => p.split("/").pop()).join(", ")}`
+                        : null
+                    }
                     sx={{
                       maxWidth: "65%",
                       px: 2,
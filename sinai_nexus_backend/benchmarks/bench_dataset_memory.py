@@ -0,0 +1,62 @@
+# -------------------------------------------------------------
+# bench_dataset_memory.py
+# -------------------------------------------------------------
+# Purpose:
+#   Report how much memory the compact (categorical) scheduling
+#   table saves compared with loading the Parquet as plain Python
+#   object columns, and how fast the handlers' main filter runs
+#   on each.
+#
+# Run from sinai_nexus_backend/:
+#   python -m benchmarks.bench_dataset_memory [path/to/snapshot.parquet]
+# -------------------------------------------------------------
+
+import sys
+import time
+import pandas as pd
+
+from src.data_loader import SCHEDULING_COLUMNS, _read_compact_frame
+
+DEFAULT_PATH = "data/new_scheduling_clean.parquet"
+
+
+def _mb(n_bytes) -> float:
+    return n_bytes / 1e6
+
+
+def _time_filter(df: pd.DataFrame, exam: str, repeat: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        df[df["EAP Name"] == exam]
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main(path: str = DEFAULT_PATH):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    raw = pd.read_parquet(path)
+    compact = _read_compact_frame(data)
+
+    raw_usage = raw.memory_usage(deep=True)
+    compact_usage = compact.memory_usage(deep=True)
+
+    print(f"Rows: {len(raw)}")
+    print(f"{'column':<28}{'object MB':>12}{'compact MB':>12}")
+    for col in raw.columns:
+        kept = compact_usage[col] if col in compact_usage else 0
+        label = col if col in SCHEDULING_COLUMNS else f"{col} (dropped)"
+        print(f"{label:<28}{_mb(raw_usage[col]):>12.1f}{_mb(kept):>12.1f}")
+
+    total_raw, total_compact = raw_usage.sum(), compact_usage.sum()
+    print(f"{'TOTAL':<28}{_mb(total_raw):>12.1f}{_mb(total_compact):>12.1f}")
+    print(f"Saved {_mb(total_raw - total_compact):.1f} MB "
+          f"({(1 - total_compact / total_raw) * 100:.1f}%)")
+
+    exam = raw["EAP Name"].iloc[0]
+    print(f"df[df['EAP Name'] == exam]: object {_time_filter(raw, exam):.2f} ms, "
+          f"categorical {_time_filter(compact, exam):.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,76 @@
+# -------------------------------------------------------------
+# bench_embeddings.py
+# -------------------------------------------------------------
+# Purpose:
+#   Compare the embedding providers (src/embeddings.py):
+#     - bulk throughput: 600-char chunks/s, batched like /upload
+#     - query latency:   p50 / p95 of single short questions
+#   Providers that are not usable here (no HF_TOKEN, no ONNX model
+#   or onnxruntime) are reported as skipped.
+#
+# Run from sinai_nexus_backend/:
+#   python -m benchmarks.bench_embeddings [n_chunks]
+# -------------------------------------------------------------
+
+import sys
+import time
+import random
+
+from src.embeddings import PROVIDERS
+
+WORDS = (
+    "patient mri ct contrast screening implant pacemaker room hess union square "
+    "scanner appointment prep fasting creatinine allergy protocol radiology exam "
+    "technologist schedule arrive minutes before gown metal remove form consent"
+).split()
+
+QUERIES = [
+    "MRI implant prep?", "what to do for MRI with implant", "HESS CT ROOM 6",
+    "contrast allergy premedication", "how early to arrive for ct", "fasting before pet ct",
+]
+
+
+def synthetic_chunks(n: int, rng) -> list:
+    chunks = []
+    for _ in range(n):
+        text = ""
+        while len(text) < 600:
+            text += rng.choice(WORDS) + " "
+        chunks.append(text[:600])
+    return chunks
+
+
+def main():
+    n_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    rng = random.Random(0)
+    chunks = synthetic_chunks(n_chunks, rng)
+
+    print(f"{'provider':>10} {'chunks/s':>10} {'query p50 ms':>13} {'query p95 ms':>13}")
+    for name, cls in PROVIDERS.items():
+        try:
+            provider = cls()
+            provider.embed(QUERIES[:1])   # warm up (model load, connection)
+        except Exception as e:
+            print(f"{name:>10}  skipped: {e}")
+            continue
+
+        started = time.perf_counter()
+        vecs = provider.embed(chunks)
+        bulk = time.perf_counter() - started
+        assert vecs.shape == (n_chunks, provider.dim)
+
+        samples = []
+        for i in range(30):
+            started = time.perf_counter()
+            provider.embed([QUERIES[i % len(QUERIES)]])
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+
+        print(
+            f"{name:>10} {n_chunks / bulk:>10.1f} "
+            f"{samples[len(samples) // 2] * 1000:>13.2f} {samples[int(len(samples) * 0.95)] * 1000:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# -------------------------------------------------------------
+# bench_matchers.py
+# -------------------------------------------------------------
+# Purpose:
+#   Microbenchmark for exam-name matching: the old per-call path
+#   (rebuild + normalize the whole corpus, then extractOne) versus
+#   the prebuilt ExamMatcher attached to each dataset snapshot, the
+#   batch (cdist) path behind /match, and the token-index shortlist
+#   against a full scan on 10x / 100x synthetic catalogs.
+#
+# Run from sinai_nexus_backend/:
+#   python -m benchmarks.bench_matchers [path/to/snapshot.parquet]
+# -------------------------------------------------------------
+
+import sys
+import time
+import random
+from rapidfuzz import fuzz, process
+
+from src.data_loader import SchedulingSnapshot, _read_compact_frame
+from src.fuzzy_matchers import normalize_text, ExamMatcher, EXAM_SCORE_CUTOFF
+
+DEFAULT_PATH = "data/new_scheduling_clean.parquet"
+
+QUERIES = [
+    "ct head wo", "ct head w/o iv", "mri brain", "CT CHEST", "xr chest 2 views",
+    "us abdomen complete", "mri lumbar spine wo", "ct abdomen pelvis w",
+    "mammo screening", "dexa", "pet ct", "nuclear stress", "fluoro", "ct abd",
+]
+
+
+def rebuild_per_call_match(exam_query: str, exam_names):
+    """The pre-ExamMatcher best_exam_match body, kept for comparison."""
+    norm_query = normalize_text(exam_query)
+    norm_map = {normalize_text(e): e for e in exam_names}
+    match = process.extractOne(norm_query, list(norm_map.keys()), scorer=fuzz.token_set_ratio)
+    if not match or match[1] < 55:
+        return None
+    return norm_map[match[0]]
+
+
+def full_scan_match(exam_query: str, matcher: ExamMatcher):
+    """extractOne over every name in the catalog (no shortlist)."""
+    match = process.extractOne(
+        normalize_text(exam_query), matcher.choices,
+        scorer=fuzz.token_set_ratio, score_cutoff=EXAM_SCORE_CUTOFF,
+    )
+    return matcher.norm_map[match[0]] if match else None
+
+
+def synthetic_catalog(exam_names, factor: int, rng: random.Random):
+    """
+    Grow the real exam list `factor` times with plausible new names:
+    copies of real names with one word swapped and sometimes one added,
+    the way new departments/modalities extend the export.
+    """
+    names = list(exam_names)
+    words = " ".join(names).split()
+    catalog = dict.fromkeys(names)
+    while len(catalog) < len(names) * factor:
+        tokens = rng.choice(names).split()
+        tokens[rng.randrange(len(tokens))] = rng.choice(words)
+        if rng.random() < 0.5:
+            tokens.append(rng.choice(words))
+        catalog[" ".join(tokens)] = None
+    return list(catalog)
+
+
+def time_per_query(fn, queries, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - started) / (repeat * len(queries)) * 1e6
+
+
+def main(path: str = DEFAULT_PATH):
+    with open(path, "rb") as f:
+        ds = SchedulingSnapshot(_read_compact_frame(f.read()))
+    exam_names = ds.df["EAP Name"].dropna().unique()
+    matcher = ds.exam_matcher
+
+    # Same answers before timing anything
+    for q in QUERIES:
+        assert rebuild_per_call_match(q, exam_names) == matcher.match(q), q
+
+    started = time.perf_counter()
+    ExamMatcher(exam_names)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    old_us = time_per_query(lambda q: rebuild_per_call_match(q, exam_names), QUERIES, repeat=3)
+    new_us = time_per_query(matcher.match, QUERIES, repeat=50)
+
+    print(f"Exam corpus: {len(matcher.choices)} normalized names (build once: {build_ms:.1f} ms)")
+    print(f"rebuild per call : {old_us:10.1f} µs/query")
+    print(f"prebuilt matcher : {new_us:10.1f} µs/query  ({old_us / new_us:.0f}x faster)")
+
+    # Batch matching: a synthetic feed of 2,000 lines drawn from 500
+    # distinct raw names (feeds repeat the same procedures a lot)
+    rng = random.Random(0)
+    words = " ".join(matcher.choices).split()
+    distinct = [" ".join(rng.sample(words, rng.randint(2, 4))) for _ in range(500)]
+    feed = [rng.choice(distinct) for _ in range(2000)]
+
+    started = time.perf_counter()
+    for q in feed:
+        matcher.match(q)
+    loop_rate = len(feed) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    matcher.match_many(feed, top_k=3)
+    batch_rate = len(feed) / (time.perf_counter() - started)
+
+    print(f"one match() per name : {loop_rate:10.0f} names/s")
+    print(f"match_many (cdist)   : {batch_rate:10.0f} names/s")
+
+    # Token-index shortlist vs scoring every name, as the catalog grows.
+    # Queries mix the fixed list above with random word combinations.
+    queries = QUERIES + distinct[:50]
+    for factor in (1, 10, 100):
+        catalog = exam_names if factor == 1 else synthetic_catalog(exam_names, factor, rng)
+        started = time.perf_counter()
+        big = ExamMatcher(catalog)
+        build_s = time.perf_counter() - started
+
+        # Identical answers to the full scan
+        for q in queries:
+            assert big.match(q) == full_scan_match(q, big), q
+
+        scanned = sum(len(big.index.shortlist(normalize_text(q), EXAM_SCORE_CUTOFF)) for q in queries)
+        full_us = time_per_query(lambda q: full_scan_match(q, big), queries, repeat=1)
+        fast_us = time_per_query(big.match, queries, repeat=1)
+        print(f"{factor:>3}x catalog ({len(big.choices):>6} names, build {build_s:5.2f} s): "
+              f"full scan {full_us:9.1f} µs/query, shortlist {fast_us:8.1f} µs/query "
+              f"({full_us / fast_us:4.1f}x), scores {scanned / len(queries) / len(big.choices):.1%} of names")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
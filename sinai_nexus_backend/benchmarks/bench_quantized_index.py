@@ -0,0 +1,94 @@
+# -------------------------------------------------------------
+# bench_quantized_index.py
+# -------------------------------------------------------------
+# Purpose:
+#   int8 vs float32 storage for the in-process vector index
+#   (src/int8_store.py) on 100k synthetic 384-d chunks:
+#     - recall@k of int8 search, with and without the float re-rank,
+#       against exact float32 search (k = 4 / 10 / 20, the doc, note
+#       and match_count cut-offs used by /rag-chat)
+#     - search latency p50 / p95
+#     - process memory and spill file size
+#   Chunks are drawn around topic centroids so that, as with real
+#   documents, many neighbours sit at nearly the same distance (the
+#   hard case for quantization).
+#
+# Run from sinai_nexus_backend/:
+#   python -m benchmarks.bench_quantized_index [n_chunks]
+# -------------------------------------------------------------
+
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+from src.int8_store import make_vectors
+
+DIM = 384
+TOPICS = 500
+QUERIES = 200
+KS = [4, 10, 20]
+RERANK_CANDIDATES = 80   # VECTOR_INDEX_RERANK_FACTOR × 20, as in vector_index
+
+
+def clustered(n: int, rng) -> np.ndarray:
+    centroids = rng.normal(size=(TOPICS, DIM)).astype(np.float32)
+    rows = centroids[rng.integers(0, TOPICS, size=n)] + 0.8 * rng.normal(size=(n, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def top_k(similarity: np.ndarray, k: int) -> np.ndarray:
+    best = np.argpartition(-similarity, k - 1)[:k]
+    return best[np.argsort(-similarity[best], kind="stable")]
+
+
+def search(vectors, q: np.ndarray, k: int, rerank: bool) -> np.ndarray:
+    similarity = vectors.similarity(q)
+    if not rerank:
+        return top_k(similarity, k)
+    candidates = top_k(similarity, RERANK_CANDIDATES)
+    exact = vectors.exact_similarity(candidates, q)
+    return candidates[np.argsort(-exact, kind="stable")[:k]]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    matrix = clustered(n, rng)
+    queries = clustered(QUERIES, rng)
+
+    exact = make_vectors(matrix, "float32")
+    truth = [top_k(exact.similarity(q), max(KS)) for q in queries]
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        variants = [
+            ("float32", exact, False),
+            ("int8", make_vectors(matrix, "int8", rerank=False), False),
+            ("int8+rerank", make_vectors(matrix, "int8", rerank=True, spill_dir=spill_dir), True),
+        ]
+
+        print(f"{n} chunks × {DIM}d, {QUERIES} queries")
+        header = " ".join(f"{'recall@' + str(k):>10}" for k in KS)
+        print(f"{'storage':>12} {header} {'p50 ms':>7} {'p95 ms':>7} {'RAM MB':>7} {'spill MB':>9}")
+        for name, vectors, rerank in variants:
+            samples, recall = [], {k: 0.0 for k in KS}
+            search(vectors, queries[0], max(KS), rerank)   # warm up
+            for q, expected in zip(queries, truth):
+                started = time.perf_counter()
+                found = search(vectors, q, max(KS), rerank)
+                samples.append(time.perf_counter() - started)
+                for k in KS:
+                    recall[k] += len(set(found[:k]) & set(expected[:k])) / k
+            samples.sort()
+
+            cells = " ".join(f"{recall[k] / QUERIES:>10.4f}" for k in KS)
+            print(
+                f"{name:>12} {cells} "
+                f"{samples[len(samples) // 2] * 1000:>7.2f} {samples[int(len(samples) * 0.95)] * 1000:>7.2f} "
+                f"{vectors.nbytes / 1e6:>7.1f} {vectors.spill_bytes / 1e6:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -------------------------------------------------------------
+# bench_vector_index.py
+# -------------------------------------------------------------
+# Purpose:
+#   Microbenchmark for the in-process vector index behind /rag-chat:
+#   build time, memory and search latency (matmul + note filter +
+#   priority weighting) on synthetic corpora of 1k / 10k / 100k
+#   384-d chunks. For scale: the match_documents RPC it replaces is
+#   a network round trip per question (tens of ms from Render).
+#
+# Run from sinai_nexus_backend/:
+#   python -m benchmarks.bench_vector_index
+# -------------------------------------------------------------
+
+import time
+
+import numpy as np
+
+from src.vector_index import VectorIndex
+
+DIM = 384
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 200
+TODAY = "2026-06-01"
+
+
+def synthetic_rows(n: int, rng) -> list:
+    priorities = rng.choice([1, 2, 3], size=n, p=[0.1, 0.3, 0.6])
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    rows = []
+    for i in range(n):
+        note = priorities[i] == 1
+        rows.append({
+            "id": i,
+            "content": f"chunk {i}",
+            "file_path": f"other-content/file_{i // 20}.{'json' if note else 'pdf'}",
+            "priority": int(priorities[i]),
+            "start_date": "2026-01-01" if note else None,
+            "end_date": ("2026-03-01" if i % 3 == 0 else "2027-01-01") if note else None,
+            "embedding": vectors[i].tolist(),
+        })
+    return rows
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'chunks':>8} {'build s':>8} {'MB':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for n in SIZES:
+        rows = synthetic_rows(n, rng)
+        index = VectorIndex(fetch=lambda client: rows)
+
+        started = time.perf_counter()
+        index.load(None)
+        build = time.perf_counter() - started
+
+        queries = rng.normal(size=(QUERIES, DIM)).astype(np.float32)
+        index.search(queries[0], 20, TODAY)   # warm up BLAS
+        samples = []
+        for q in queries:
+            started = time.perf_counter()
+            index.search(q, 20, TODAY)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+
+        print(
+            f"{n:>8} {build:>8.2f} {index.status()['memory_mb']:>7.1f} "
+            f"{samples[len(samples) // 2] * 1000:>7.2f} {samples[int(len(samples) * 0.95)] * 1000:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,26 @@
 
 import os
 import json
+import time
+import uuid
+import asyncio
 import numpy as np
 import requests
 import google.generativeai as genai
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from fastapi import FastAPI, UploadFile, Form
+from fastapi import FastAPI, UploadFile, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from typing import Optional
+from typing import NamedTuple, Optional
 
 
 from unstructured.partition.auto import partition
-from supabase import create_client
+from supabase import create_client, acreate_client
 import pdfplumber
 from pathlib import Path
 
@@ -53,10 +58,56 @@ url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_SERVICE_KEY")
 supabase = create_client(url, key)
 
+# Async client for the async endpoints (/agent-chat). acreate_client is a
+# coroutine, so it is created on startup, inside the event loop.
+supabase_async = None
+
+@app.on_event("startup")
+async def create_async_supabase_client():
+    global supabase_async
+    supabase_async = await acreate_client(url, key)
+
 # ------------------------------
 # Sinai Nexus Scheduling Router
 # ------------------------------
-from src.query_router import answer_scheduling_query
+# Importing the router no longer loads the scheduling dataset;
+# it is loaded on a background thread once the app starts.
+from src.query_router import answer_scheduling_query_async
+from src.data_loader import dataset
+from src.match_cache import match_cache
+from src.metrics import metrics
+from src.interpretation_cache import interpretation_cache
+from src.answer_cache import answer_cache
+from src.embedding_cache import embedding_cache
+from src.embeddings import embedding_provider
+from src.vector_index import vector_index
+from src.lexical_index import (
+    is_exact_term_query, may_be_exact_term_query, reciprocal_rank_fusion, row_key,
+)
+from src.context_builder import build_context
+from src.async_pipeline import ClientDisconnected, StageTimeout, cancel_on_disconnect, run_stage
+from src.note_purger import note_purger
+from src.ingestion_jobs import ingestion_queue
+
+# How long /agent-chat waits for the dataset on a cold start
+# before answering "still loading" (seconds).
+DATASET_READY_TIMEOUT = float(os.getenv("DATASET_READY_TIMEOUT", "20"))
+
+# How often to revalidate the scheduling Parquet against Storage
+# (one metadata call; the file is only re-read when it changed).
+# 0 disables the watcher; /reload-dataset still works.
+SCHEDULING_REFRESH_INTERVAL = float(os.getenv("SCHEDULING_REFRESH_INTERVAL", "600"))
+
+@app.on_event("startup")
+def start_dataset_load():
+    dataset.start_background_load()
+    dataset.start_watcher(SCHEDULING_REFRESH_INTERVAL)
+
+# Expired notes are purged on a schedule (NOTE_PURGE_INTERVAL),
+# not on the request path.
+@app.on_event("startup")
+def start_note_purger():
+    note_purger.start(supabase)
 
 # ------------------------------
 # Gemini Setup
@@ -67,60 +118,29 @@ else:
     genai.configure()
 
 # ===============================================================
-# ✅ Hugging Face Inference API Embeddings (384-d vectors)
+# ✅ Embeddings (384-d vectors)
 # ===============================================================
-HF_TOKEN = os.getenv("HF_TOKEN")
-HF_URL = os.getenv(
-    "HF_FEATURE_URL",
-    "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction",
-)
+# The provider is chosen by EMBED_PROVIDER (src/embeddings.py):
+# "hf" (Hugging Face Inference API, default), "onnx" (local CPU) or
+# "hashing" (deterministic, tests/benchmarks).
 EMBED_NORMALIZE = os.getenv("EMBEDDINGS_NORMALIZE", "true").lower() == "true"
 
-_session = requests.Session()
+def embed_texts(texts, normalize: bool = EMBED_NORMALIZE) -> np.ndarray:
+    """Returns np.ndarray of shape (batch, 384) from the configured provider."""
+    return embedding_provider.embed(texts, normalize=normalize)
+
 
-def hf_embed(texts, normalize: bool = EMBED_NORMALIZE) -> np.ndarray:
+def embed_query(text: str, normalize: bool = EMBED_NORMALIZE) -> list:
     """
-    Returns np.ndarray of shape (batch, 384)
-    HF returns:
-      - single vector if inputs is a string
-      - list of vectors if inputs is a list of strings
-    We normalize both cases into (batch, dim).
+    Embedding of one query through the embedding cache
+    (src/embedding_cache.py): repeats make no provider call and identical
+    concurrent queries share one. Uploads call embed_texts directly.
     """
-    if not HF_TOKEN:
-        raise RuntimeError("HF_TOKEN is missing in environment variables.")
-
-    if isinstance(texts, str):
-        texts = [texts]
-
-    # Filter empty strings
-    texts = [t for t in texts if isinstance(t, str) and t.strip()]
-    if not texts:
-        return np.zeros((0, 384), dtype=np.float32)
-
-    headers = {
-        "Authorization": f"Bearer {HF_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    r = _session.post(HF_URL, headers=headers, json={"inputs": texts}, timeout=60)
-    r.raise_for_status()
-    data = r.json()
-
-    # If HF returns a single vector (list of floats), wrap it into [vector]
-    if isinstance(data, list) and data and isinstance(data[0], (int, float)):
-        data = [data]
-
-    vecs = np.array(data, dtype=np.float32)
-
-    if vecs.ndim != 2:
-        raise RuntimeError(f"Unexpected HF embedding shape: {vecs.shape}")
-
-    if normalize:
-        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
-        norms[norms == 0] = 1.0
-        vecs = vecs / norms
-
-    return vecs
+    vector = embedding_cache.get_or_compute(
+        embedding_provider.model_id, normalize, text,
+        lambda: embed_texts([text], normalize=normalize)[0],
+    )
+    return vector.tolist()
 
 # ------------------------------
 class AgentChatRequest(BaseModel):
@@ -130,16 +150,73 @@ class AgentChatRequest(BaseModel):
 # 1️⃣ Scheduling Assistant
 # ===============================================================
 @app.post("/agent-chat")
-def agent_chat(payload: AgentChatRequest):
-    """Deterministic scheduling Q&A"""
+async def agent_chat(payload: AgentChatRequest):
+    """
+    Deterministic scheduling Q&A. Async end to end: Gemini and the
+    location-notes lookups are awaited instead of holding a threadpool
+    worker for the whole request.
+    """
+    # Only a cold start has to wait for the dataset; that blocking wait
+    # goes to the threadpool so the event loop keeps serving.
+    if not dataset.is_ready and not await run_in_threadpool(
+        dataset.wait_until_ready, DATASET_READY_TIMEOUT
+    ):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "answer": "The scheduling dataset is still loading. Please try again in a few seconds.",
+                "dataset": dataset.status(),
+            },
+        )
+
     try:
         # pass supabase so location notes can be pulled from DB
-        answer = answer_scheduling_query(payload.question, supabase=supabase)
+        with metrics.timer("agent_chat.total"):
+            answer = await answer_scheduling_query_async(payload.question, supabase=supabase_async)
         return {"answer": answer}
     except Exception as e:
         return {"answer": f"Error: {str(e)}"}
 
 
+# ===============================================================
+# Batch entity matching (exam / site names → official names)
+# ===============================================================
+# For integrations that reconcile order feeds against the catalog:
+# one call resolves hundreds of raw names with the same normalization
+# and scoring as the chat matchers, without any LLM round trip.
+MATCH_MAX_BATCH = int(os.getenv("MATCH_MAX_BATCH", "5000"))
+
+class MatchRequest(BaseModel):
+    exams: list[str] = []
+    sites: list[str] = []
+    top_k: int = 3
+
+@app.post("/match")
+def match_entities(payload: MatchRequest):
+    """Resolve raw exam and/or site strings to official names, with top-k alternatives."""
+    if len(payload.exams) + len(payload.sites) > MATCH_MAX_BATCH:
+        return JSONResponse(
+            status_code=413,
+            content={"ok": False, "error": f"At most {MATCH_MAX_BATCH} names per request"},
+        )
+
+    if not dataset.wait_until_ready(DATASET_READY_TIMEOUT):
+        return JSONResponse(
+            status_code=503,
+            content={"ok": False, "error": "The scheduling dataset is still loading.", "dataset": dataset.status()},
+        )
+
+    ds = dataset.get()
+    top_k = min(max(payload.top_k, 1), 10)
+
+    return {
+        "ok": True,
+        "dataset_version": ds.version,
+        "exams": ds.exam_matcher.match_many(payload.exams, top_k) if payload.exams else [],
+        "sites": ds.site_matcher.match_many(payload.sites, top_k) if payload.sites else [],
+    }
+
+
 
 
 def extract_text_from_file(local_path: str, filename: str, content_type: str | None = None) -> str:
@@ -162,6 +239,113 @@ def extract_text_from_file(local_path: str, filename: str, content_type: str | N
 # ===============================================================
 # 2️⃣ Upload → Parse → Chunk → Embed → Insert into Supabase
 # ===============================================================
+# The work runs as a background ingestion job (src/ingestion_jobs.py):
+# /upload saves the file and answers 202 with a job id right away;
+# GET /jobs/{id} reports the parse → chunk → embed → insert → index progress.
+CHUNK_SIZE = 600
+CHUNK_OVERLAP = 80
+
+def ingestion_stages(
+    local_path: str,
+    filename: str,
+    content_type: Optional[str],
+    storage_path: str,
+    priority: int,
+    location: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+) -> list:
+    """
+    The stages of one upload; each returns its additions to the job state.
+    Only parse / chunk / embed are retried. The Supabase insert is not
+    idempotent (a commit whose response is lost would be inserted again),
+    and neither is anything after it.
+    """
+    # Determine if JSON note
+    is_note = filename.lower().endswith(".json")
+
+    def parse(state):
+        if is_note:
+            with open(local_path, "r") as f:
+                data = json.load(f)
+
+            # Combine title and content for better semantic search
+            title = data.get("title", "")
+            content = data.get("content", "")
+
+            # Format: "Title\n\nContent" so both are searchable
+            return {"text": f"{title}\n\n{content}" if title else content}
+        return {"text": extract_text_from_file(local_path, filename, content_type)}
+
+    def chunk(state):
+        text = state["text"]
+        if is_note:
+            return {"chunks": [text] if text else []}
+        return {"chunks": (
+            [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE - CHUNK_OVERLAP)]
+            if text else []
+        )}
+
+    def embed(state):
+        # Embed Chunks (configured provider, batched)
+        return {"embeddings": embed_texts(state["chunks"])}
+
+    def insert(state):
+        chunks = state["chunks"]
+        rows = []
+        for chunk_text, emb_vector in zip(chunks, state["embeddings"]):
+            row = {
+                "content": chunk_text,
+                "embedding": emb_vector.tolist(),
+                # Automatic priority 1 for notes
+                "priority": 1 if is_note else priority,
+                "file_path": storage_path
+            }
+
+            # Add ONLY what we need: location metadata for scheduling notes
+            if location:
+                row["location"] = location
+
+            # ✅ Added: effective date range (ONLY for notes)
+            if is_note:
+                if start_date:
+                    row["start_date"] = start_date
+                if end_date:
+                    row["end_date"] = end_date
+
+            rows.append(row)
+
+        inserted = supabase.table("documents").insert(rows).execute().data if rows else []
+
+        return {"inserted": inserted or rows, "result": {
+            "message": f"Inserted {len(chunks)} chunks into Supabase",
+            "chunks_added": len(chunks)
+        }}
+
+    def index(state):
+        # Local bookkeeping after the rows are committed (the vector
+        # index also resyncs from Supabase on its next refresh)
+        if state["inserted"]:
+            vector_index.add_rows(state["inserted"])
+
+        # Cached answers built from an earlier version of this file are stale
+        answer_cache.invalidate_file(storage_path)
+
+    return [
+        ("parse", parse),
+        ("chunk", chunk),
+        ("embed", embed),
+        ("insert", insert, False),
+        ("index", index, False),
+    ]
+
+
+def _save_upload(local_path: str, content: bytes):
+    os.makedirs("uploads", exist_ok=True)
+    with open(local_path, "wb") as f:
+        f.write(content)
+
+
 @app.post("/upload")
 async def upload_file(
     file: UploadFile,
@@ -172,80 +356,46 @@ async def upload_file(
     end_date: Optional[str] = Form(None), 
 ):
     """
-    Upload a document or JSON note, chunk it, embed it, store it in Supabase.
+    Upload a document or JSON note; it is chunked, embedded and stored
+    in Supabase by a background job. Returns the job id to poll.
     priority = 1 (highest), 2, or 3 (lowest, default)
     JSON notes in Other_Notes folder are automatically priority 1.
     """
-
-    os.makedirs("uploads", exist_ok=True)
-    local_path = f"uploads/{file.filename}"
+    # Unique name: two uploads of the same file may be queued at once
+    local_path = f"uploads/{uuid.uuid4()}_{file.filename}"
 
     # Save File
-    with open(local_path, "wb") as f:
-        f.write(await file.read())
+    await run_in_threadpool(_save_upload, local_path, await file.read())
 
     # Use the path sent from frontend if provided, otherwise use filename
     storage_path = path if path else f"other-content/{file.filename}"
 
-    # Determine if JSON note
-    is_note = file.filename.lower().endswith(".json")
-
-    if is_note:
-        # Automatic priority 1 for notes
-        priority = 1
-        with open(local_path, "r") as f:
-            data = json.load(f)
-
-        # Combine title and content for better semantic search
-        title = data.get("title", "")
-        content = data.get("content", "")
-
-        # Format: "Title\n\nContent" so both are searchable
-        text = f"{title}\n\n{content}" if title else content
-        chunks = [text] if text else []
-    else:
-        text = extract_text_from_file(local_path, file.filename, file.content_type)
-
-        chunk_size = 600
-        overlap = 80
-        chunks = (
-            [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
-            if text else []
-        )
-
-
-    # Embed Chunks (HF Inference API)
-    embeddings = hf_embed(chunks)
-
-    rows = []
-    for chunk, emb_vector in zip(chunks, embeddings):
-        row = {
-            "content": chunk,
-            "embedding": emb_vector.tolist(),
-            "priority": priority,
-            "file_path": storage_path
-        }
-
-        # Add ONLY what we need: location metadata for scheduling notes
-        if location:
-            row["location"] = location
-
-        # ✅ Added: effective date range (ONLY for notes)
-        if is_note:
-            if start_date:
-                row["start_date"] = start_date
-            if end_date:
-                row["end_date"] = end_date
-
-        rows.append(row)
-
-    if rows:
-        supabase.table("documents").insert(rows).execute()
-
-    return {
-        "message": f"Inserted {len(chunks)} chunks into Supabase",
-        "chunks_added": len(chunks)
-    }
+    job = ingestion_queue.submit(
+        ingestion_stages(
+            local_path, file.filename, file.content_type, storage_path,
+            priority, location, start_date, end_date,
+        ),
+        info={"filename": file.filename, "file_path": storage_path},
+    )
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": f"Ingestion of {file.filename} queued",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}",
+        },
+    )
+
+
+@app.get("/jobs/{job_id}")
+def get_ingestion_job(job_id: str):
+    """Status of an upload: stage progress, attempts and timings."""
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"ok": False, "error": "Unknown job id"})
+    return job.to_dict()
 
 
 # ===============================================================
@@ -317,6 +467,9 @@ async def delete_file(request: DeleteFileRequest):
 
     print(f"✅ Deleted {deleted_count} rows from documents table")
 
+    vector_index.remove_files(file_path, obj_path)
+    answer_cache.invalidate_file(file_path, obj_path)
+
     # 2) Delete from storage bucket
     storage_deleted = False
     storage_error = None
@@ -363,31 +516,50 @@ def is_note_active(row: dict, today: str) -> bool:
 # ===============================================================
 # 4️⃣ RAG Chat (Optimized Notes + Chunks Context)
 # ===============================================================
-@app.post("/rag-chat")
-async def rag_chat(query: str = Form(...)):
-    # Embed query (HF Inference API)
-    q_embed = hf_embed([query]).tolist()[0]
+# Chunks considered per question before filtering / weighting
+RAG_MATCH_COUNT = int(os.getenv("RAG_MATCH_COUNT", "20"))
 
-    # ✅ ADDED: auto-delete expired notes (opportunistic)
-    today = today_ny_str()
-    try:
-        (
-            supabase.table("documents")
-            .delete()
-            .eq("priority", 1)
-            .ilike("file_path", "%.json")   # notes are JSON
-            .lt("end_date", today)          # expired
-            .execute()
-        )
-    except Exception as e:
-        print("purge expired notes error:", e)
+# Hybrid retrieval: BM25 + vector candidates fused with RRF
+# (src/lexical_index.py). Exact terms no longer depend on the
+# embeddings, so each side contributes a smaller candidate set.
+HYBRID_RETRIEVAL_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+
+# Full resync of the in-process vector index, for rows written by other
+# instances or directly in Supabase (seconds; 0 disables).
+VECTOR_INDEX_REFRESH_INTERVAL = float(os.getenv("VECTOR_INDEX_REFRESH_INTERVAL", "1800"))
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+
+# Per-stage timeouts of the /rag-chat pipeline (seconds; 0 disables).
+# Generation is timed to its first response chunk when streaming.
+RAG_EMBED_TIMEOUT = float(os.getenv("RAG_EMBED_TIMEOUT", "15"))
+RAG_SEARCH_TIMEOUT = float(os.getenv("RAG_SEARCH_TIMEOUT", "10"))
+RAG_GENERATE_TIMEOUT = float(os.getenv("RAG_GENERATE_TIMEOUT", "60"))
+
+@app.on_event("startup")
+def start_vector_index_load():
+    if VECTOR_INDEX_ENABLED:
+        vector_index.start_background_load(supabase)
+        vector_index.start_watcher(supabase, VECTOR_INDEX_REFRESH_INTERVAL)
+
+
+class RagContext(NamedTuple):
+    embedding: list      # query embedding (None when lexical search sufficed)
+    context: str         # joined note + doc chunks
+    sources: list        # their file paths (notes first, de-duplicated, in rank order)
+    chunk_ids: list      # ids of the chunks in the context
 
-    # 1. Search Supabase
+
+def match_documents_rpc(q_embed, today: str, match_count: int) -> list:
+    """
+    Nearest chunks through the Supabase `match_documents` RPC, nearest
+    first, with inactive notes removed.
+    """
     result = supabase.rpc(
         "match_documents",
         {
             "query_embedding": q_embed,
-            "match_count": 20  # get enough results to rank properly
+            "match_count": match_count  # get enough results to rank properly
         }
     ).execute()
 
@@ -400,7 +572,15 @@ async def rag_chat(query: str = Form(...)):
             if not is_note_active(row, today):
                 continue
         filtered.append(row)
-    items = filtered
+    return filtered
+
+
+def search_documents_rpc(q_embed, today: str, match_count: int = RAG_MATCH_COUNT) -> list:
+    """
+    match_documents_rpc ranked by priority-weighted distance; the
+    in-process vector index (src/vector_index.py) does the same locally.
+    """
+    items = match_documents_rpc(q_embed, today, match_count)
 
     # 2. Priority scoring (notes = priority 1 → strongest weight)
     scored = []
@@ -419,34 +599,138 @@ async def rag_chat(query: str = Form(...)):
         scored.append((score, row))
 
     scored.sort(key=lambda x: x[0])
+    return [row for score, row in scored]
+
 
-    # 3. Separate notes (priority 1) and docs (priority > 1)
-    notes = [row for score, row in scored if row["priority"] == 1][:3]   # top 3 notes
-    docs  = [row for score, row in scored if row["priority"] > 1][:4]    # top 4 doc chunks
-
-    # 4. Combine context - STRIP TITLES from notes
-    note_chunks = []
-    for row in notes:
-        content = row["content"]
-        # If content has title format (Title\n\nContent), extract only content after first double newline
-        if "\n\n" in content:
-            parts = content.split("\n\n", 1)  # Split only on first occurrence
-            note_chunks.append(parts[1])      # Take everything after title
+def rank_fused(rankings: list) -> list:
+    """
+    Reciprocal rank fusion of several ranked lists, then the same
+    priority weighting as above. The fused score is higher-is-better,
+    so it is divided by the weight (notes ÷ 0.3, priority 2 ÷ 0.7).
+    """
+    scored = []
+    for fused, row in reciprocal_rank_fusion(rankings):
+        pr = row.get("priority", 3)
+        weight = 0.3 if pr == 1 else 0.7 if pr == 2 else 1.0
+        scored.append((fused / weight, row))
+
+    scored.sort(key=lambda x: -x[0])
+    return [row for score, row in scored]
+
+
+def vector_candidates(q_embed, today: str, match_count: int, weighted: bool) -> list:
+    """
+    Vector search: the in-process index, or the Supabase RPC while it is
+    not loaded (or if it fails). weighted=True ranks by priority-weighted
+    distance, otherwise nearest first.
+    """
+    ranked = None
+    try:
+        if weighted:
+            ranked = vector_index.search(q_embed, match_count, today)
         else:
-            note_chunks.append(content)       # No title, use as-is
+            ranked = vector_index.nearest(q_embed, match_count, today)
+    except Exception as e:
+        print("vector index search error:", e)
 
-    doc_chunks = [row["content"] for row in docs]
+    if ranked is not None:
+        metrics.incr("rag_chat.search.index")
+        return ranked
 
-    # Combine context
-    top_chunks = note_chunks + doc_chunks
-    context = "\n\n".join(top_chunks)
+    metrics.incr("rag_chat.search.rpc")
+    if weighted:
+        return search_documents_rpc(q_embed, today, match_count)
+    return match_documents_rpc(q_embed, today, match_count)
 
-    # 5. STOP-SEARCH: if query text literally appears in context
-    if query.lower() in context.lower():
-        return {"answer": context}
 
-    # 6. Gemini Prompt
-    prompt = f"""
+async def retrieve_rag_context(query: str) -> RagContext:
+    """
+    Retrieval half of /rag-chat, shared with /rag-chat-stream, as an
+    async pipeline (src/async_pipeline.py). The BM25 search and the
+    query embedding are independent, so they run concurrently; only a
+    possible exact-term lookup waits for BM25 first, since a hit there
+    means no embedding is needed at all.
+    """
+    # Expired notes are deleted by the scheduled purge (src/note_purger.py);
+    # every search path skips inactive notes on its own
+    today = today_ny_str()
+
+    def lexical_stage():
+        if not HYBRID_RETRIEVAL_ENABLED:
+            return None
+        return run_stage(
+            "rag_chat.stage.lexical",
+            run_in_threadpool(vector_index.lexical_search, query, HYBRID_CANDIDATES, today),
+            RAG_SEARCH_TIMEOUT,
+        )
+
+    def embed_stage():
+        # Cached; the provider is only called on a miss
+        return run_stage("rag_chat.stage.embed", run_in_threadpool(embed_query, query), RAG_EMBED_TIMEOUT)
+
+    # 1. Search. BM25 is local and may make the embedding unnecessary;
+    # a question that cannot be an exact-term lookup embeds in parallel.
+    lexical = q_embed = None
+    if HYBRID_RETRIEVAL_ENABLED and may_be_exact_term_query(query):
+        lexical = await lexical_stage()
+        if lexical is not None and is_exact_term_query(query, lexical):
+            metrics.incr("rag_chat.retrieval.lexical_only")
+            return build_rag_context(rank_fused([lexical]), None)
+        q_embed = await embed_stage()
+    elif HYBRID_RETRIEVAL_ENABLED:
+        lexical, q_embed = await asyncio.gather(lexical_stage(), embed_stage())
+    else:
+        q_embed = await embed_stage()
+
+    if lexical is None:
+        # BM25 index not loaded (or hybrid disabled): vector search only
+        metrics.incr("rag_chat.retrieval.vector")
+        ranked = await run_stage(
+            "rag_chat.stage.vector",
+            run_in_threadpool(vector_candidates, q_embed, today, RAG_MATCH_COUNT, True),
+            RAG_SEARCH_TIMEOUT,
+        )
+    else:
+        metrics.incr("rag_chat.retrieval.hybrid")
+        vector = await run_stage(
+            "rag_chat.stage.vector",
+            run_in_threadpool(vector_candidates, q_embed, today, HYBRID_CANDIDATES, False),
+            RAG_SEARCH_TIMEOUT,
+        )
+        ranked = rank_fused([vector, lexical])
+
+    return build_rag_context(ranked, q_embed)
+
+
+def build_rag_context(ranked: list, q_embed) -> RagContext:
+    """
+    Prompt context from a ranking: top notes, then doc chunks, without
+    near-duplicates and within the token budget (src/context_builder.py).
+    """
+    built = build_context(ranked)
+
+    metrics.incr("rag_chat.context.naive_tokens", built.naive_tokens)
+    metrics.incr("rag_chat.context.tokens", built.tokens)
+    metrics.incr("rag_chat.context.duplicates", built.duplicates)
+    metrics.incr("rag_chat.context.merges", built.merges)
+    if built.duplicates or built.merges:
+        change = (built.tokens - built.naive_tokens) * 100 // max(built.naive_tokens, 1)
+        print(
+            f"🧩 RAG context ~{built.naive_tokens} → ~{built.tokens} tokens "
+            f"({change:+d}%, {built.duplicates} duplicates, {built.merges} merges)"
+        )
+
+    sources = []
+    for row in built.rows:
+        path = row.get("file_path")
+        if path and path not in sources:
+            sources.append(path)
+
+    return RagContext(q_embed, built.context, sources, [row_key(row) for row in built.rows])
+
+
+def build_rag_prompt(query: str, context: str) -> str:
+    return f"""
 You are a Mount Sinai Radiology assistant.
 Give ALL answers in plain text. No markdown. No asterisks.
 
@@ -462,11 +746,196 @@ Question:
 {query}
 """
 
+
+async def answer_rag_query(query: str) -> str:
+    """The /rag-chat pipeline: retrieval, then the cached or generated answer."""
+    rag = await retrieve_rag_context(query)
+    context = rag.context
+
+    # 5. STOP-SEARCH: if query text literally appears in context
+    if query.lower() in context.lower():
+        return context
+
+    # Paraphrase of an answered question over the same chunks?
+    cached = answer_cache.lookup(rag.embedding, rag.chunk_ids)
+    if cached is not None:
+        metrics.incr("rag_chat.answer_cache.hit")
+        return cached
+    metrics.incr("rag_chat.answer_cache.miss")
+
+    # 6. Gemini Prompt
+    prompt = build_rag_prompt(query, context)
+
     model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
+    response = await run_stage(
+        "rag_chat.stage.generate", model.generate_content_async(prompt), RAG_GENERATE_TIMEOUT
+    )
+
+    answer = response.text.strip()
+    answer_cache.store(rag.embedding, rag.chunk_ids, rag.sources, answer)
+    return answer
 
-    return {"answer": response.text.strip()}
 
+@app.post("/rag-chat")
+async def rag_chat(request: Request, query: str = Form(...)):
+    started = time.perf_counter()
+    try:
+        answer = await cancel_on_disconnect(request, answer_rag_query(query))
+    except ClientDisconnected:
+        # Nobody is waiting for the answer any more; Gemini was not called
+        # (or its call was cancelled)
+        metrics.incr("rag_chat.cancelled")
+        return Response(status_code=499)
+    except StageTimeout as e:
+        print("rag-chat timeout:", e)
+        return JSONResponse(
+            status_code=504,
+            content={"answer": "The assistant took too long to answer. Please try again."},
+        )
+    finally:
+        metrics.observe("rag_chat.total", time.perf_counter() - started)
+
+    return {"answer": answer}
+
+
+# ===============================================================
+# 4️⃣b RAG Chat — streaming (Server-Sent Events)
+# ===============================================================
+# Same retrieval and prompt as /rag-chat, but the answer is streamed
+# while Gemini generates it instead of after the whole response:
+#
+#   event: sources   data: {"sources": [file paths]}     ← sent first
+#   event: token     data: {"text": "..."}               ← repeated
+#   event: done      data: {"ttfb_ms", "first_token_ms", "total_ms"}
+#   event: error     data: {"error": "..."}              ← on failure
+#
+# Timings go to /metrics as rag_chat_stream.ttfb (first byte = sources),
+# rag_chat_stream.first_token and rag_chat_stream.total.
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/rag-chat-stream")
+async def rag_chat_stream(request: Request, query: str = Form(...)):
+    started = time.perf_counter()
+
+    async def events():
+        ttfb = first_token = None
+        try:
+            # Nothing is sent before the sources, so watch for a disconnect
+            # here; once streaming, the server stops the generator itself
+            rag = await cancel_on_disconnect(request, retrieve_rag_context(query))
+            context = rag.context
+
+            ttfb = time.perf_counter() - started
+            metrics.observe("rag_chat_stream.ttfb", ttfb)
+            yield _sse("sources", {"sources": rag.sources})
+
+            # 5. STOP-SEARCH: the context itself is the answer;
+            # a cached answer for a paraphrase is sent in one piece
+            stop_search = query.lower() in context.lower()
+            cached = None if stop_search else answer_cache.lookup(rag.embedding, rag.chunk_ids)
+            if not stop_search:
+                metrics.incr(f"rag_chat.answer_cache.{'miss' if cached is None else 'hit'}")
+
+            if stop_search or cached is not None:
+                first_token = time.perf_counter() - started
+                yield _sse("token", {"text": context if stop_search else cached})
+            else:
+                parts = []
+                model = genai.GenerativeModel("gemini-2.5-flash")
+                response = await run_stage(
+                    "rag_chat_stream.stage.generate",
+                    model.generate_content_async(build_rag_prompt(query, context), stream=True),
+                    RAG_GENERATE_TIMEOUT,
+                )
+                async for chunk in response:
+                    # chunks without parts (e.g. the final safety/usage chunk) have no text
+                    text = chunk.text if chunk.parts else ""
+                    if not text:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    parts.append(text)
+                    yield _sse("token", {"text": text})
+                answer_cache.store(rag.embedding, rag.chunk_ids, rag.sources, "".join(parts).strip())
+        except ClientDisconnected:
+            metrics.incr("rag_chat_stream.cancelled")
+            return
+        except Exception as e:
+            print("rag-chat-stream error:", e)
+            metrics.incr("rag_chat_stream.errors")
+            yield _sse("error", {"error": "Failed to generate an answer."})
+
+        total = time.perf_counter() - started
+        if first_token is not None:
+            metrics.observe("rag_chat_stream.first_token", first_token)
+        metrics.observe("rag_chat_stream.total", total)
+
+        def ms(seconds):
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        yield _sse("done", {
+            "ttfb_ms": ms(ttfb),
+            "first_token_ms": ms(first_token),
+            "total_ms": ms(total),
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No proxy buffering, or the tokens arrive all at once
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+# ===============================================================
+# Scheduling dataset hot reload
+# ===============================================================
+@app.post("/reload-dataset")
+def reload_dataset(force: bool = False):
+    """
+    Build a fresh scheduling snapshot from Storage in the background
+    and swap it in atomically. Call after exams_cleanup.py publishes
+    a new canonical Parquet. force=true rebuilds even if the Parquet
+    is unchanged.
+    """
+    started = dataset.reload(force=force)
+    return {
+        "ok": True,
+        "message": "Dataset reload started" if started else "A dataset reload is already running",
+        "dataset": dataset.status(),
+    }
+
+
+# ===============================================================
+# Expired notes purge (admin)
+# ===============================================================
+@app.post("/admin/purge-expired-notes")
+def purge_expired_notes_now():
+    """Run the scheduled expired-notes purge now."""
+    deleted = note_purger.run_once(supabase)
+    return {"ok": True, "deleted": deleted, "note_purge": note_purger.status()}
+
+
+# ===============================================================
+# Scheduling interpretation cache (admin)
+# ===============================================================
+@app.get("/admin/interpretation-cache")
+def inspect_interpretation_cache(limit: int = 50):
+    """Stats plus the most recent cached Gemini interpretations."""
+    return {
+        "ok": True,
+        "stats": interpretation_cache.stats(),
+        "entries": interpretation_cache.entries(min(max(limit, 0), 500)),
+    }
+
+@app.delete("/admin/interpretation-cache")
+def flush_interpretation_cache(expired_only: bool = False):
+    """Delete every cached interpretation (or only expired ones)."""
+    removed = interpretation_cache.flush(expired_only=expired_only)
+    return {"ok": True, "removed": removed, "stats": interpretation_cache.stats()}
 
 
 # Add this model near the top with your other models
@@ -532,4 +1001,21 @@ def home():
 
 @app.get("/healthz")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    # Answers immediately; the dataset state is informational only
+    return {
+        "status": "ok",
+        "dataset": dataset.status(),
+        "match_cache": match_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "embedding_provider": embedding_provider.model_id,
+        "embedding_cache": embedding_cache.stats(),
+        "vector_index": vector_index.status(),
+        "note_purge": note_purger.status(),
+        "ingestion": ingestion_queue.stats(),
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    # Counters and latency percentiles since startup (see src/metrics.py),
+    # e.g. how many scheduling questions skipped Gemini (parse_path.rules)
+    return metrics.snapshot()
\ No newline at end of file
@@ -0,0 +1,158 @@
+# -------------------------------------------------------------
+# answer_cache.py
+# -------------------------------------------------------------
+# Purpose:
+#   Semantic cache of /rag-chat answers, so paraphrases of a question
+#   that was already answered ("MRI implant prep?" / "what to do for
+#   MRI with implant") skip the Gemini generation.
+#
+#   An entry is (query embedding, retrieved chunk ids) → answer.
+#   A stored answer is served only when BOTH hold:
+#     1) the new query retrieved exactly the same chunks, and
+#     2) its embedding is within ANSWER_CACHE_THRESHOLD cosine
+#        similarity of the stored query.
+#   (1) means a new upload that outranks the old context, or a note
+#   that expired, is a miss by construction. On top of that,
+#   invalidate_file() drops every entry built from a file that
+#   /upload or /delete-file touched, since its chunks may have
+#   changed under the same ids.
+#
+#   Bounded LRU (ANSWER_CACHE_SIZE) with a TTL (ANSWER_CACHE_TTL);
+#   stats() is reported by /healthz.
+# -------------------------------------------------------------
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+# Tight on purpose: all-MiniLM paraphrases of one question score
+# ~0.9+, different questions about the same document much lower.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+
+
+def _unit(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32).ravel()
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        # entry id → (expires_at, embedding, chunk_ids, file_paths, answer)
+        self._entries = OrderedDict()
+        # retrieved chunk set → entry ids; lookups only compare
+        # embeddings among entries with the same retrieved set
+        self._by_chunks = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, entry_id):
+        """Remove one entry (caller holds the lock)."""
+        _, _, chunk_ids, _, _ = self._entries.pop(entry_id)
+        ids = self._by_chunks.get(chunk_ids)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_chunks[chunk_ids]
+
+    def lookup(self, embedding, chunk_ids):
+        """Return the stored answer for a near-identical query over the same chunks, or None."""
+        if self.maxsize <= 0 or embedding is None or not chunk_ids:
+            return None
+
+        chunk_ids = frozenset(chunk_ids)
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_sim = None, self.threshold
+            for entry_id in list(self._by_chunks.get(chunk_ids, ())):
+                expires_at, stored, _, _, _ = self._entries[entry_id]
+                if expires_at <= now:
+                    self._drop(entry_id)
+                    continue
+                sim = float(stored @ query)
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][4]
+
+    def store(self, embedding, chunk_ids, file_paths, answer: str):
+        if self.maxsize <= 0 or embedding is None or not chunk_ids or not answer:
+            return
+
+        chunk_ids = frozenset(chunk_ids)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                time.monotonic() + self.ttl,
+                _unit(embedding),
+                chunk_ids,
+                frozenset(file_paths),
+                answer,
+            )
+            self._by_chunks.setdefault(chunk_ids, set()).add(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_file(self, *file_paths) -> int:
+        """Drop every answer built from any of `file_paths`; return how many."""
+        paths = {p for p in file_paths if p}
+        with self._lock:
+            stale = [
+                entry_id
+                for entry_id, (_, _, _, sources, _) in self._entries.items()
+                if sources & paths
+            ]
+            for entry_id in stale:
+                self._drop(entry_id)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_chunks.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,78 @@
+# -------------------------------------------------------------
+# async_pipeline.py
+# -------------------------------------------------------------
+# Purpose:
+#   Helpers for handlers written as async pipelines (/rag-chat):
+#
+#     run_stage()            → one stage with its own timeout; timings
+#                              go to /metrics, timeouts are counted
+#     cancel_on_disconnect() → runs the whole pipeline and cancels it
+#                              as soon as the client has gone away
+#
+#   Independent stages are started together with asyncio.gather, so a
+#   request costs its critical path instead of the sum of its stages.
+#
+#   Blocking work (embedding HTTP calls, Supabase RPCs, numpy search)
+#   runs in the threadpool. A stage that times out or is cancelled is
+#   no longer awaited, but its worker thread cannot be interrupted: it
+#   finishes in the background and the result is dropped (a query
+#   embedding still lands in the embedding cache for the next request).
+# -------------------------------------------------------------
+
+import os
+import time
+import asyncio
+
+from src.metrics import metrics
+
+# How often a running pipeline checks whether the client is still there (seconds)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.25"))
+
+
+class StageTimeout(Exception):
+    """A pipeline stage did not finish within its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection; the pipeline was cancelled."""
+
+
+async def run_stage(name: str, awaitable, timeout: float):
+    """
+    Await one stage, giving up after `timeout` seconds (0 → no limit).
+    Observed as the `name` timing; a timeout increments `name.timeout`
+    and raises StageTimeout (the awaitable is cancelled).
+    """
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(awaitable, timeout if timeout > 0 else None)
+    except asyncio.TimeoutError:
+        metrics.incr(f"{name}.timeout")
+        raise StageTimeout(name, timeout) from None
+    finally:
+        metrics.observe(name, time.perf_counter() - started)
+
+
+async def cancel_on_disconnect(request, awaitable, poll: float = DISCONNECT_POLL_INTERVAL):
+    """
+    Run `awaitable` to completion unless `request`'s client disconnects
+    first; then cancel it and raise ClientDisconnected.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            # Let the pipeline unwind (and its stages record their timings)
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,182 @@
+# -------------------------------------------------------------
+# context_builder.py
+# -------------------------------------------------------------
+# Purpose:
+#   Assemble the /rag-chat prompt context from a ranked list of chunks
+#   without paying for the same text twice:
+#
+#   1) near-duplicates are dropped: word-shingle containment against
+#      every chunk already taken (the same file uploaded under several
+#      names produces identical chunks)
+#   2) the token budget is filled by score: the top RAG_CONTEXT_MAX_NOTES
+#      notes always go in, then doc chunks are taken down the whole
+#      ranking (skipping any that no longer fit) until
+#      RAG_CONTEXT_TOKEN_BUDGET is used up. RAG_CONTEXT_MAX_DOCS is an
+#      optional cap on the number of doc chunks (0 → budget only).
+#      Slots freed by dropped duplicates are refilled from lower ranks.
+#   3) adjacent chunks of the same file are merged into one passage:
+#      /upload cuts 600-char chunks with an 80-char overlap, so the
+#      tail of one chunk is the head of the next and is kept once
+#
+#   Tokens are estimated as characters / 4 (no tokenizer dependency).
+#   Every build reports its size against the plain concatenation it
+#   replaces (top 3 notes + top 4 doc chunks); main.py logs it and counts
+#   it in /metrics.
+# -------------------------------------------------------------
+
+import os
+import re
+from typing import NamedTuple
+
+# About what the old 3 notes + 4 chunks cost, now spent on distinct text
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "800"))
+RAG_CONTEXT_MAX_NOTES = int(os.getenv("RAG_CONTEXT_MAX_NOTES", "3"))
+RAG_CONTEXT_MAX_DOCS = int(os.getenv("RAG_CONTEXT_MAX_DOCS", "0"))   # 0 → no cap
+# Share of a chunk's shingles found in a kept chunk that makes it a duplicate
+RAG_CONTEXT_DUP_THRESHOLD = float(os.getenv("RAG_CONTEXT_DUP_THRESHOLD", "0.8"))
+
+CHUNK_OVERLAP = 80          # characters shared by consecutive /upload chunks
+# The context this builder replaced: top notes + top doc chunks, as they were
+_NAIVE_NOTES, _NAIVE_DOCS = 3, 4
+_SHINGLE_WORDS = 5
+_WORD_RE = re.compile(r"\w+")
+
+
+class BuiltContext(NamedTuple):
+    context: str        # notes, then doc passages, separated by blank lines
+    rows: list          # chunks used, notes first, in rank order
+    naive_tokens: int   # what the old top 3 notes + 4 docs would cost
+    tokens: int
+    duplicates: int     # chunks dropped as near-duplicates
+    merges: int         # adjacent chunk pairs joined
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def note_body(content: str) -> str:
+    """Notes are stored as "Title\\n\\nContent"; only the content goes in the prompt."""
+    if "\n\n" in content:
+        return content.split("\n\n", 1)[1]
+    return content
+
+
+def shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= _SHINGLE_WORDS:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + _SHINGLE_WORDS]) for i in range(len(words) - _SHINGLE_WORDS + 1)}
+
+
+def is_near_duplicate(candidate: set, kept: list, threshold: float = RAG_CONTEXT_DUP_THRESHOLD) -> bool:
+    """Containment of the smaller shingle set in the other, against each kept chunk."""
+    for other in kept:
+        smaller = min(len(candidate), len(other))
+        if smaller and len(candidate & other) / smaller >= threshold:
+            return True
+    return False
+
+
+def _merge_adjacent(texts: list, files: list) -> tuple:
+    """
+    Join chunks whose tail is another chunk's head (same file). Each
+    passage stays at the position of its best-ranked chunk.
+    Returns (passages, number of merges).
+    """
+    passages = list(texts)
+    merges = 0
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(passages)):
+            for j in range(len(passages)):
+                if i == j or files[i] != files[j] or passages[i] is None or passages[j] is None:
+                    continue
+                head = passages[j][:CHUNK_OVERLAP]
+                if len(head) == CHUNK_OVERLAP and passages[i].endswith(head):
+                    keep, drop = min(i, j), max(i, j)
+                    passages[keep] = passages[i] + passages[j][CHUNK_OVERLAP:]
+                    passages[drop] = None
+                    merges += 1
+                    merged = True
+    return [p for p in passages if p is not None], merges
+
+
+def _adjacent(text: str, file_path, taken: list) -> bool:
+    """Does `text` continue or precede a taken chunk of the same file?"""
+    if len(text) < CHUNK_OVERLAP:
+        return False
+    for row, other in taken:
+        if row.get("file_path") != file_path:
+            continue
+        if other.endswith(text[:CHUNK_OVERLAP]) or (
+            len(other) >= CHUNK_OVERLAP and text.endswith(other[:CHUNK_OVERLAP])
+        ):
+            return True
+    return False
+
+
+def build_context(
+    ranked: list,
+    token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+    max_notes: int = RAG_CONTEXT_MAX_NOTES,
+    max_docs: int = RAG_CONTEXT_MAX_DOCS,
+) -> BuiltContext:
+    """Context for the prompt from chunks ranked best first."""
+    notes = [row for row in ranked if row["priority"] == 1]
+    docs = [row for row in ranked if row["priority"] > 1]
+
+    naive = [note_body(row["content"]) for row in notes[:_NAIVE_NOTES]]
+    naive += [row["content"] for row in docs[:_NAIVE_DOCS]]
+    naive_tokens = estimate_tokens("\n\n".join(naive))
+
+    kept_shingles = []
+    taken_notes, taken_docs = [], []
+    budget = token_budget
+    duplicates = 0
+
+    # Notes override the documents, so they are never left out
+    for row in notes[:max_notes]:
+        text = note_body(row["content"])
+        sh = shingles(text)
+        if is_near_duplicate(sh, kept_shingles):
+            duplicates += 1
+            continue
+        budget -= estimate_tokens(text)
+        kept_shingles.append(sh)
+        taken_notes.append((row, text))
+
+    # Doc chunks by score until the budget is used up
+    for row in docs:
+        if budget <= 0 or (max_docs > 0 and len(taken_docs) >= max_docs):
+            break
+        text = row["content"]
+        sh = shingles(text)
+        if is_near_duplicate(sh, kept_shingles):
+            duplicates += 1
+            continue
+        # The overlap with an adjacent chunk already taken is merged away
+        cost = estimate_tokens(text)
+        if _adjacent(text, row.get("file_path"), taken_docs):
+            cost = estimate_tokens(text[CHUNK_OVERLAP:])
+        if cost > budget:
+            continue
+        budget -= cost
+        kept_shingles.append(sh)
+        taken_docs.append((row, text))
+
+    note_texts = [text for _, text in taken_notes]
+    doc_texts, merges = _merge_adjacent(
+        [text for _, text in taken_docs], [row.get("file_path") for row, _ in taken_docs]
+    )
+
+    context = "\n\n".join(note_texts + doc_texts)
+    return BuiltContext(
+        context=context,
+        rows=[row for row, _ in taken_notes + taken_docs],
+        naive_tokens=naive_tokens,
+        tokens=estimate_tokens(context),
+        duplicates=duplicates,
+        merges=merges,
+    )
@@ -6,36 +6,52 @@
 #   records into memory for other modules to use.
 #
 #   This ensures all data sources are initialized in one place,
-#   so that other modules (like query_handlers) can simply
-#   import df, PREFIX_TO_DEP, and USER_UPDATES directly.
+#   so that other modules (like query_handlers) can simply ask
+#   for the current dataset with get_dataset().
+#
+#   Nothing heavy happens at import time: the Parquet download,
+#   pd.read_parquet and the prefix scans run the first time the
+#   dataset is needed, or on a background thread started by the
+#   app at startup (see DatasetManager below). That keeps uvicorn
+#   from waiting on Supabase before it can bind.
+#
+#   A newer Parquet can be picked up without a restart: reload()
+#   builds a complete new snapshot off to the side and swaps it in
+#   with a single reference assignment.
 # -------------------------------------------------------------
 
+import numpy as np
 import pandas as pd
 import json
 from supabase import create_client
 import os
+import threading
+import time
 from io import BytesIO
 from dotenv import load_dotenv
 from data.location_prefixes import LOCATION_PREFIXES
+from src.scheduling_index import SchedulingIndex
+from src.snapshot_cache import (
+    load_snapshot_bytes,
+    read_cached_snapshot,
+    download_snapshot,
+    refresh_snapshot,
+)
 
-load_dotenv()  
+load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
-bucket = "epic-scheduling"
-path = "Locations_Rooms/new_scheduling_clean.parquet"
+_supabase = None
 
-# Download Parquet bytes
-res = supabase.storage.from_(bucket).download(path)
 
-if not res:
-    raise Exception("Unable to download parquet from Supabase")
-
-# Read Parquet directly into DataFrame: Loads the cleaned scheduling data
-df = pd.read_parquet(BytesIO(res))
+def _get_supabase():
+    """Create the Storage client on first use instead of at import."""
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    return _supabase
 
 
 # Load user updates (if file exists)
@@ -45,6 +61,32 @@ try:
 except FileNotFoundError:
     USER_UPDATES = {"disabled_exams": []}
 
+# -------------------------------------------------------------
+# Location prefix lookup
+# -------------------------------------------------------------
+# Both maps below need "which location prefixes does this department
+# name start with?". Instead of running str.startswith(prefix) over
+# the whole table once per prefix, we group the prefixes by length and
+# check each distinct department name once: name[:n] in prefixes_of_len_n.
+# Cost is (distinct names × distinct prefix lengths), independent of
+# the number of rows, and a name may still match several prefixes.
+
+def _prefix_lookup(location_prefixes: dict):
+    by_length = {}
+    for prefix in location_prefixes.keys():
+        by_length.setdefault(len(prefix), set()).add(prefix)
+    order = {prefix: i for i, prefix in enumerate(location_prefixes.keys())}
+
+    def matching(name: str) -> list:
+        found = [
+            name[:n] for n, prefixes in by_length.items()
+            if name[:n] in prefixes
+        ]
+        return sorted(found, key=order.get)
+
+    return matching
+
+
 # Build a mapping from location prefixes to full department names
 # One location prefix may correspond to multiple department names
 # This creates a mapping like:
@@ -58,44 +100,367 @@ except FileNotFoundError:
 #   ]
 # }
 
-LOCATION_TO_DEPARTMENTS = {}
+def _build_location_to_departments(df: pd.DataFrame, location_prefixes: dict) -> dict:
+    matching = _prefix_lookup(location_prefixes)
+    mapping = {prefix: [] for prefix in location_prefixes.keys()}
 
-for prefix in LOCATION_PREFIXES.keys():
-    deps = (
-        df[df["DEP Name"].str.startswith(prefix)]["DEP Name"]
-        .drop_duplicates()
-        .tolist()
-    )
+    # One pass over the distinct department names, in table order
+    for dep in df["DEP Name"].dropna().unique():
+        for prefix in matching(str(dep)):
+            mapping[prefix].append(dep)
 
-    if not deps:
-        print(f"⚠️ Warning: location prefix '{prefix}' matched no departments")
+    for prefix, deps in mapping.items():
+        if not deps:
+            print(f"⚠️ Warning: location prefix '{prefix}' matched no departments")
 
-    LOCATION_TO_DEPARTMENTS[prefix] = deps
+    return mapping
 
 # -------------------------------------------------------------
 # Room prefix → location prefix mapping
 # -------------------------------------------------------------
 # Example: "HESS" -> "1470 MADISON AVE", "RA" -> "1176 5TH AVE"
 # We infer it from the dataset so no hardcoding is needed.
+#
+# For each location we count room-name first tokens over the rows of
+# its departments and keep the 15 most common. The counting is done
+# on distinct (department, room) pairs weighted by how many rows each
+# pair has, so the result is the same as counting the exploded column.
 
 def _build_room_prefix_to_location(df: pd.DataFrame, location_prefixes: dict) -> dict:
     mapping = {}
     if "Room Name" not in df.columns or "DEP Name" not in df.columns:
         return mapping
 
-    for loc_prefix in location_prefixes.keys():
-        subset = df[df["DEP Name"].astype(str).str.startswith(loc_prefix)]
-        rooms = subset["Room Name"].dropna().astype(str)
+    dep_col, room_col = df["DEP Name"].astype("category"), df["Room Name"].astype("category")
+    dep_names, room_names = dep_col.cat.categories, room_col.cat.categories
+
+    # Distinct (department, room) pairs with their row count and first row
+    dep_codes = dep_col.cat.codes.to_numpy()
+    room_codes = room_col.cat.codes.to_numpy()
+    rows = np.flatnonzero((dep_codes >= 0) & (room_codes >= 0))
+    keys = dep_codes[rows].astype(np.int64) * len(room_names) + room_codes[rows]
+    pair_keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+
+    # room prefix = first token (e.g., "HESS CT ROOM 6" -> "HESS")
+    first_tokens = [
+        (str(room).split() or [None])[0]
+        for room in room_names
+    ]
+    matching = _prefix_lookup(location_prefixes)
+    dep_locations = [matching(str(dep)) for dep in dep_names]
+
+    # location → {token: [row count, first row seen]}
+    token_counts = {}
+    for key, first_row, count in zip(pair_keys, rows[first], counts):
+        token = first_tokens[key % len(room_names)]
+        if token is None:
+            continue
+        for loc_prefix in dep_locations[key // len(room_names)]:
+            entry = token_counts.setdefault(loc_prefix, {}).setdefault(token, [0, first_row])
+            entry[0] += count
+            entry[1] = min(entry[1], first_row)
 
-        # room prefix = first token (e.g., "HESS CT ROOM 6" -> "HESS")
-        first_tokens = rooms.str.split().str[0].dropna()
-        if first_tokens.empty:
+    for loc_prefix in location_prefixes.keys():
+        tokens = token_counts.get(loc_prefix)
+        if not tokens:
             continue
 
+        # Same ordering as value_counts() on the exploded column: tokens
+        # in order of first appearance, then sorted by count
+        ordered = sorted(tokens, key=lambda t: tokens[t][1])
+        counts_series = pd.Series([tokens[t][0] for t in ordered], index=ordered)
+
         # take most common prefixes for this location
-        for token in first_tokens.value_counts().head(15).index.tolist():
+        for token in counts_series.sort_values(ascending=False).head(15).index.tolist():
             mapping.setdefault(token, loc_prefix)
 
     return mapping
 
-ROOM_PREFIX_TO_LOCATION = _build_room_prefix_to_location(df, LOCATION_PREFIXES)
\ No newline at end of file
+
+# -------------------------------------------------------------
+# Compact in-memory table
+# -------------------------------------------------------------
+# The exploded table repeats the same few thousand strings across
+# ~800k DEP×Room rows. We only load the columns the handlers query,
+# and read them as Parquet dictionary columns so pandas keeps them as
+# categoricals: one small int code per row plus one copy of each
+# string. Filters like df["EAP Name"] == exam then compare integer
+# codes instead of Python strings.
+#
+# "Visit Type Name" is still produced by exams_cleanup.py but is not
+# used by any handler, so it is not loaded.
+
+SCHEDULING_COLUMNS = ["EAP Name", "DEP Name", "Room Name", "Visit Type Length"]
+
+
+def _read_compact_frame(parquet_bytes: bytes) -> pd.DataFrame:
+    return pd.read_parquet(
+        BytesIO(parquet_bytes),
+        columns=SCHEDULING_COLUMNS,
+        read_dictionary=SCHEDULING_COLUMNS,
+    )
+
+
+# -------------------------------------------------------------
+# Dataset snapshot
+# -------------------------------------------------------------
+# One loaded version of the scheduling data: the DataFrame plus
+# every map derived from it. Handlers read all of these from the
+# same snapshot object so they never mix two versions.
+
+class SchedulingSnapshot:
+    def __init__(self, df: pd.DataFrame, manifest=None):
+        self.df = df
+        self.manifest = manifest or {}
+        self.version = self.manifest.get("sha256") or "unknown"
+        self.loaded_at = pd.Timestamp.now().isoformat()
+        self.memory_mb = round(df.memory_usage(deep=True).sum() / 1e6, 1)
+
+        self.LOCATION_TO_DEPARTMENTS = _build_location_to_departments(df, LOCATION_PREFIXES)
+        self.ROOM_PREFIX_TO_LOCATION = _build_room_prefix_to_location(df, LOCATION_PREFIXES)
+
+        # Per-intent lookups (exam → departments, exam → rooms, ...)
+        self.index = SchedulingIndex(df, self.ROOM_PREFIX_TO_LOCATION)
+
+        # Matcher corpora are part of the snapshot too, so a reload swaps
+        # them together with the data they were built from.
+        # (Imported here because fuzzy_matchers imports this module.)
+        from src.fuzzy_matchers import ExamMatcher, SiteMatcher
+        self.exam_matcher = ExamMatcher(df["EAP Name"].dropna().unique())
+        self.site_matcher = SiteMatcher(self.LOCATION_TO_DEPARTMENTS, LOCATION_PREFIXES)
+
+
+def load_snapshot(refresh: bool = False, skip_version=None):
+    """
+    Read the Parquet snapshot and build all derived maps.
+
+    refresh=False → startup path: serve the local cache right away; if
+                    the background revalidation finds a newer Parquet,
+                    it triggers dataset.reload().
+    refresh=True  → reload path: revalidate against Storage first. If
+                    the resulting version equals `skip_version`, return
+                    None instead of rebuilding an identical snapshot.
+    """
+    supabase = _get_supabase()
+
+    if refresh:
+        refresh_snapshot(supabase)
+        cached = read_cached_snapshot()
+        res, manifest = cached if cached else download_snapshot(supabase)
+        if skip_version and manifest.get("sha256") == skip_version:
+            return None
+    else:
+        res, manifest = load_snapshot_bytes(
+            supabase,
+            on_refresh=lambda _manifest: dataset.reload_after_load(),
+        )
+
+    # Read Parquet directly into a compact (categorical) DataFrame
+    df = _read_compact_frame(res)
+
+    snapshot = SchedulingSnapshot(df, manifest)
+    print(f"📦 Scheduling table: {len(df)} rows, {snapshot.memory_mb} MB in memory "
+          f"({len(SCHEDULING_COLUMNS)} categorical columns)")
+    return snapshot
+
+
+# -------------------------------------------------------------
+# Dataset manager
+# -------------------------------------------------------------
+# Owns the current snapshot and its readiness state:
+#   "idle"    → nothing loaded yet
+#   "loading" → a load is running (background thread or first use)
+#   "ready"   → snapshot available
+#   "error"   → last load failed; the next request retries it
+#
+# Usage:
+#   dataset.start_background_load()   # app startup, returns immediately
+#   dataset.get()                     # blocks until loaded (first use)
+#   dataset.wait_until_ready(5)       # bounded wait for request handlers
+#   dataset.reload()                  # build + swap a newer snapshot
+#
+# Hot reload never mutates the snapshot that is being served. A request
+# should call get_dataset() once and use that object throughout, so it
+# sees one consistent version even if a swap happens mid-request.
+
+class DatasetManager:
+    def __init__(self, loader=load_snapshot):
+        self._loader = loader
+        self._snapshot = None
+        self._state = "idle"
+        self._error = None
+        self._load_seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()   # set when the current load attempt finishes
+        self._thread = None
+
+        self._reloading = False
+        self._reload_count = 0
+        self._last_reload_at = None
+        self._last_reload_error = None
+        self._watcher = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        return self._snapshot is not None
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            snapshot = self._loader()
+        except Exception as e:
+            print("❌ Scheduling dataset load failed:", e)
+            with self._lock:
+                self._state = "error"
+                self._error = str(e)
+            self._done.set()
+            return
+
+        with self._lock:
+            # A reload may have installed a newer snapshot meanwhile; keep it
+            if self._snapshot is None:
+                self._snapshot = snapshot
+            self._state = "ready"
+            self._error = None
+            self._load_seconds = round(time.perf_counter() - started, 3)
+        self._done.set()
+        print(f"✅ Scheduling dataset ready ({len(self._snapshot.df)} rows, {self._load_seconds}s)")
+
+    def start_background_load(self):
+        """Kick off a load on a daemon thread unless one is running or done."""
+        with self._lock:
+            if self._state in ("loading", "ready"):
+                return
+            self._state = "loading"
+            self._done = threading.Event()
+            self._thread = threading.Thread(target=self._load, name="dataset-load", daemon=True)
+            self._thread.start()
+
+    def wait_until_ready(self, timeout=None) -> bool:
+        """Start a load if needed and wait up to `timeout` seconds for it."""
+        if self.is_ready:
+            return True
+        self.start_background_load()
+        self._done.wait(timeout)
+        return self.is_ready
+
+    def get(self) -> SchedulingSnapshot:
+        """Return the current snapshot, loading it first if necessary."""
+        if self._snapshot is None:
+            self.wait_until_ready()
+            if self._snapshot is None:
+                raise RuntimeError(f"Scheduling dataset failed to load: {self._error}")
+        return self._snapshot
+
+    def _reload(self, force: bool):
+        current = self._snapshot
+        try:
+            skip = None if (force or current is None) else current.version
+            snapshot = self._loader(refresh=True, skip_version=skip)
+        except Exception as e:
+            print("❌ Scheduling dataset reload failed:", e)
+            with self._lock:
+                self._reloading = False
+                self._last_reload_error = str(e)
+            return
+
+        with self._lock:
+            if snapshot is not None:
+                # The swap: one reference assignment. Requests that already
+                # hold the old snapshot finish on it; new ones get this one.
+                self._snapshot = snapshot
+                self._state = "ready"
+                self._error = None
+                self._reload_count += 1
+            self._reloading = False
+            self._last_reload_at = pd.Timestamp.now().isoformat()
+            self._last_reload_error = None
+        self._done.set()
+
+        if snapshot is None:
+            print("✅ Scheduling dataset already current; no reload needed")
+        else:
+            print(f"🔄 Scheduling dataset swapped to {snapshot.version[:12]} ({len(snapshot.df)} rows)")
+
+    def reload(self, force: bool = False, wait: bool = False) -> bool:
+        """
+        Build a fresh snapshot in the background and swap it in.
+        Returns False if a reload is already running.
+        """
+        with self._lock:
+            if self._reloading:
+                return False
+            self._reloading = True
+
+        if wait:
+            self._reload(force)
+        else:
+            threading.Thread(target=self._reload, args=(force,), name="dataset-reload", daemon=True).start()
+        return True
+
+    def reload_after_load(self):
+        """
+        Reload once the running load attempt has finished. Used when the
+        startup revalidation finds a newer snapshot while the cached one
+        is still being built: the two builds never run side by side.
+        """
+        done = self._done
+
+        def _deferred():
+            done.wait()
+            self.reload(wait=True)
+
+        threading.Thread(target=_deferred, name="dataset-reload-deferred", daemon=True).start()
+
+    def start_watcher(self, interval_seconds: float):
+        """Periodically revalidate the snapshot (cheap ETag check) and reload on change."""
+        if interval_seconds <= 0 or self._watcher is not None:
+            return
+
+        def _watch():
+            while True:
+                time.sleep(interval_seconds)
+                if self.is_ready:
+                    self.reload(wait=True)
+
+        self._watcher = threading.Thread(target=_watch, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+
+    def status(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "state": self._state,
+            "ready": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "rows": len(snapshot.df) if snapshot else None,
+            "memory_mb": snapshot.memory_mb if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "load_seconds": self._load_seconds,
+            "error": self._error,
+            "reloading": self._reloading,
+            "reload_count": self._reload_count,
+            "last_reload_at": self._last_reload_at,
+            "last_reload_error": self._last_reload_error,
+        }
+
+
+dataset = DatasetManager()
+
+
+def get_dataset() -> SchedulingSnapshot:
+    """Shortcut used by the matchers and handlers."""
+    return dataset.get()
+
+
+def __getattr__(name):
+    # Backwards compatibility for `from src.data_loader import df` etc.
+    # These now resolve lazily against the current snapshot.
+    if name in ("df", "LOCATION_TO_DEPARTMENTS", "ROOM_PREFIX_TO_LOCATION"):
+        return getattr(get_dataset(), name)
+    if name == "SNAPSHOT_MANIFEST":
+        return get_dataset().manifest
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,181 @@
+# -------------------------------------------------------------
+# embedding_cache.py
+# -------------------------------------------------------------
+# Purpose:
+#   Cache of query embeddings so a repeated /rag-chat question does
+#   not pay for another round trip to the embedding API.
+#
+#   - Keyed by (model, normalize flag, sha256 of the text): changing
+#     the model URL or normalization never serves stale vectors.
+#   - In-memory LRU of EMBED_CACHE_SIZE vectors.
+#   - Optional on-disk persistence: set EMBED_CACHE_PATH to a SQLite
+#     file and entries survive restarts (memory misses fall through
+#     to disk before calling the API).
+#   - Single-flight: concurrent misses on the same key share one
+#     compute() call; the others wait for its result.
+#
+#   A hit (memory or disk) makes no HTTP call. stats() → /healthz.
+# -------------------------------------------------------------
+
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")   # empty → memory only
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key    TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+)
+"""
+
+
+def embedding_key(model: str, normalize: bool, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}|{int(bool(normalize))}|{digest}"
+
+
+class EmbeddingCache:
+    def __init__(self, maxsize: int = EMBED_CACHE_SIZE, path: str = EMBED_CACHE_PATH):
+        self.maxsize = maxsize
+        self.path = path
+        self._entries = OrderedDict()   # key → read-only float32 vector
+        self._inflight = {}             # key → Future of the leader's compute
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    # ---------- disk ----------
+    def _connection(self):
+        # Opened lazily; one connection shared under self._disk_lock
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, key):
+        if not self.path:
+            return None
+        try:
+            with self._disk_lock:
+                row = self._connection().execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+            return np.frombuffer(row[0], dtype=np.float32) if row else None
+        except sqlite3.Error as e:
+            # A broken cache file must never break /rag-chat
+            print("embedding cache disk get error:", e)
+            self.errors += 1
+            return None
+
+    def _disk_put(self, key, vector: np.ndarray):
+        if not self.path:
+            return
+        try:
+            with self._disk_lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, vector.tobytes()),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print("embedding cache disk put error:", e)
+            self.errors += 1
+
+    # ---------- memory ----------
+    def _remember(self, key, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, model: str, normalize: bool, text: str, compute) -> np.ndarray:
+        """
+        Return the embedding of `text`, calling compute() (→ 1-d vector)
+        only on a miss. The result is read-only and shared; copy it
+        before modifying.
+        """
+        if self.maxsize <= 0:
+            return np.asarray(compute(), dtype=np.float32)
+
+        key = embedding_key(model, normalize, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # Someone is already computing this key: wait for their result
+            return pending.result()
+
+        try:
+            vector = self._disk_get(key)
+            if vector is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                vector = np.array(compute(), dtype=np.float32).ravel()
+                self._disk_put(key, vector)
+            vector.flags.writeable = False
+            self._remember(key, vector)
+            pending.set_result(vector)
+            return vector
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "path": self.path or None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+                "errors": self.errors,
+            }
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,253 @@
+# -------------------------------------------------------------
+# embeddings.py
+# -------------------------------------------------------------
+# Purpose:
+#   Embedding providers behind one interface, chosen by EMBED_PROVIDER:
+#
+#     "hf"      → Hugging Face Inference API (default; what /upload
+#                 and /rag-chat always used)
+#     "onnx"    → in-process CPU inference of a local MiniLM-compatible
+#                 ONNX export (EMBED_ONNX_MODEL_PATH + tokenizer.json),
+#                 needs the optional `onnxruntime` and `tokenizers` packages
+#     "hashing" → deterministic feature hashing, no model and no network;
+#                 for tests and benchmarks
+#
+#   Every provider returns float32 arrays of shape (batch, dim) and
+#   L2-normalizes them when asked, like the HF path did.
+#
+#   The stored `documents` embeddings come from all-MiniLM-L6-v2, so
+#   only "hf" and an ONNX export of that same model produce vectors
+#   that can be searched against them. "hashing" lives in its own
+#   vector space: use it against a corpus embedded with it.
+#
+#   benchmarks/bench_embeddings.py reports bulk throughput and query
+#   latency per provider.
+# -------------------------------------------------------------
+
+import os
+import hashlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+import requests
+
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "hf").lower()
+EMBED_DIM = int(os.getenv("EMBED_DIM", "384"))
+# Texts per request / inference call on bulk uploads
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+HF_TOKEN = os.getenv("HF_TOKEN")
+HF_URL = os.getenv(
+    "HF_FEATURE_URL",
+    "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction",
+)
+
+EMBED_ONNX_MODEL_PATH = os.getenv("EMBED_ONNX_MODEL_PATH", "models/all-MiniLM-L6-v2/model.onnx")
+EMBED_ONNX_TOKENIZER_PATH = os.getenv("EMBED_ONNX_TOKENIZER_PATH", "")   # default: next to the model
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))          # 0 → onnxruntime default
+EMBED_MAX_TOKENS = int(os.getenv("EMBED_MAX_TOKENS", "256"))            # MiniLM's training length
+
+
+def _l2_normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+class EmbeddingProvider(ABC):
+    """Base class: subclasses implement _embed_batch(texts) → (n, dim) float32."""
+
+    name = "base"
+
+    def __init__(self, dim: int = EMBED_DIM, batch_size: int = EMBED_BATCH_SIZE):
+        self.dim = dim
+        self.batch_size = max(1, batch_size)
+
+    @property
+    def model_id(self) -> str:
+        """Identity of the vector space (part of the embedding cache key)."""
+        return self.name
+
+    @abstractmethod
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        """Raw (unnormalized) embeddings of one batch of non-empty texts."""
+
+    def embed(self, texts, normalize: bool = True) -> np.ndarray:
+        """
+        Returns np.ndarray of shape (batch, dim). Empty / non-string
+        inputs are dropped, as hf_embed always did.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+
+        texts = [t for t in texts if isinstance(t, str) and t.strip()]
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        parts = [
+            self._embed_batch(texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        vecs = np.vstack(parts).astype(np.float32, copy=False)
+
+        if vecs.ndim != 2:
+            raise RuntimeError(f"Unexpected {self.name} embedding shape: {vecs.shape}")
+
+        return _l2_normalize(vecs) if normalize else vecs
+
+
+# ===============================================================
+# Hugging Face Inference API (remote)
+# ===============================================================
+class HFInferenceProvider(EmbeddingProvider):
+    name = "hf"
+
+    def __init__(self, url: str = HF_URL, token: str = HF_TOKEN, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.token = token
+        self._session = requests.Session()
+
+    @property
+    def model_id(self) -> str:
+        return self.url
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        if not self.token:
+            raise RuntimeError("HF_TOKEN is missing in environment variables.")
+
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+        }
+
+        r = self._session.post(self.url, headers=headers, json={"inputs": texts}, timeout=60)
+        r.raise_for_status()
+        data = r.json()
+
+        # If HF returns a single vector (list of floats), wrap it into [vector]
+        if isinstance(data, list) and data and isinstance(data[0], (int, float)):
+            data = [data]
+
+        return np.array(data, dtype=np.float32)
+
+
+# ===============================================================
+# Local ONNX MiniLM (in-process, CPU)
+# ===============================================================
+class OnnxMiniLMProvider(EmbeddingProvider):
+    """
+    sentence-transformers style embedding: token embeddings from the
+    ONNX model, mean-pooled over the attention mask. Works with a
+    feature-extraction export of all-MiniLM-L6-v2 (e.g. from optimum).
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_path: str = EMBED_ONNX_MODEL_PATH,
+        tokenizer_path: str = EMBED_ONNX_TOKENIZER_PATH,
+        threads: int = EMBED_ONNX_THREADS,
+        max_tokens: int = EMBED_MAX_TOKENS,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBED_PROVIDER=onnx needs `pip install onnxruntime tokenizers`"
+            ) from e
+
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"ONNX embedding model not found: {model_path}")
+        tokenizer_path = tokenizer_path or os.path.join(os.path.dirname(model_path), "tokenizer.json")
+
+        self.model_path = model_path
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    @property
+    def model_id(self) -> str:
+        return f"onnx:{os.path.basename(os.path.dirname(os.path.abspath(self.model_path)))}"
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        tokens = self.session.run(None, feeds)[0]          # (batch, seq, dim)
+        weights = mask[..., None].astype(np.float32)
+        return (tokens * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+
+# ===============================================================
+# Deterministic hashing embedder (tests / benchmarks)
+# ===============================================================
+@lru_cache(maxsize=1 << 16)
+def _hashed_feature(feature: str):
+    # blake2b is stable across processes; memoized since vocabularies are small
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h, 1.0 if (h >> 63) else -1.0
+
+
+class HashingProvider(EmbeddingProvider):
+    """
+    Feature hashing of word unigrams and character trigrams into `dim`
+    signed buckets. Same text → same vector on every machine (blake2b,
+    not Python's salted hash()); similar wording → similar vectors.
+    """
+
+    name = "hashing"
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing:{self.dim}"
+
+    def _features(self, text: str):
+        words = text.lower().split()
+        yield from words
+        for word in words:
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h, sign = _hashed_feature(feature)
+                out[row, h % self.dim] += sign
+        return out
+
+
+PROVIDERS = {
+    "hf": HFInferenceProvider,
+    "onnx": OnnxMiniLMProvider,
+    "hashing": HashingProvider,
+}
+
+
+def make_provider(name: str = EMBED_PROVIDER) -> EmbeddingProvider:
+    try:
+        cls = PROVIDERS[name]
+    except KeyError:
+        raise RuntimeError(f"Unknown EMBED_PROVIDER {name!r}; expected one of {sorted(PROVIDERS)}")
+    return cls()
+
+
+embedding_provider = make_provider()
@@ -7,9 +7,10 @@
 # -------------------------------------------------------------
 
 from rapidfuzz import fuzz, process
+import numpy as np
 import re
-from src.data_loader import df, LOCATION_TO_DEPARTMENTS
-from data.location_prefixes import LOCATION_PREFIXES
+from src.data_loader import get_dataset
+from src.match_cache import match_cache
 
 # Common abbreviation and cleanup rules
 ABBREV_MAP = {
@@ -21,16 +22,426 @@ ABBREV_MAP = {
 
 IGNORE_WORDS = ["exam", "study"]
 
+# Compiled once; applied in the same order as the maps above
+_ABBREV_PATTERNS = [(re.compile(short), full) for short, full in ABBREV_MAP.items()]
+_IGNORE_PATTERNS = [re.compile(rf"\b{w}\b") for w in IGNORE_WORDS]
+_WHITESPACE = re.compile(r"\s+")
+
+# Minimum token_set_ratio score for an exam match.
+# You can tune this value:
+# - higher threshold → safer but more "no match" results
+# - lower threshold  → more matches but risk of false positives
+EXAM_SCORE_CUTOFF = 55
+
 def normalize_text(s: str):
     """Simplify text (expand abbreviations, remove filler words)."""
     s = s.lower()
-    for short, full in ABBREV_MAP.items():
-        s = re.sub(short, full, s)
-    for w in IGNORE_WORDS:
-        s = re.sub(rf"\b{w}\b", "", s)
-    return re.sub(r"\s+", " ", s).strip()
+    for pattern, full in _ABBREV_PATTERNS:
+        s = pattern.sub(full, s)
+    for pattern in _IGNORE_PATTERNS:
+        s = pattern.sub("", s)
+    return _WHITESPACE.sub(" ", s).strip()
+
+
+class ExamMatcher:
+    """
+    Prebuilt exam-name corpus for one dataset snapshot.
+
+    The normalized choice list only changes when the dataset changes,
+    so it is built once here (data_loader attaches one matcher to each
+    snapshot) instead of on every best_exam_match call.
+    """
+
+    def __init__(self, exam_names):
+        # Build a dictionary that maps a *normalized* version of each exam
+        # → back to the original official exam name.
+        #
+        # Example:
+        #   "ct head without intravenous contrast" → "CT HEAD WO IV CONTRAST"
+        #
+        # This lets us do fuzzy matching on the normalized keys, but still
+        # return the exact original string from the dataframe.
+        self.norm_map = {normalize_text(e): e for e in exam_names}
+
+        # The list of normalized exam names that we will compare against
+        # the normalized user query.
+        self.choices = list(self.norm_map.keys())
+
+        # Token inverted index used to shortlist candidates (see _TokenIndex)
+        self.index = _TokenIndex(self.choices)
+
+    def match(self, exam_query: str):
+        """Return the official exam name for `exam_query`, or None."""
+        scored = self.match_scored(exam_query)
+        return scored[0] if scored else None
+
+    def match_scored(self, exam_query: str):
+        """Return (official exam name, score) for `exam_query`, or None."""
+
+        # Normalize the user's text:
+        # - make lowercase
+        # - expand abbreviations (wo → without, iv → intravenous, etc.)
+        # - remove filler words like "exam" or "study"
+        norm_query = normalize_text(exam_query)
+
+        # Only names that could still score at least the cutoff are
+        # compared (see _TokenIndex.shortlist); the rest provably lose.
+        candidates = self.index.shortlist(norm_query, EXAM_SCORE_CUTOFF)
+        if not candidates:
+            return None
+
+        # Use RapidFuzz to find the single best match.
+        # - fuzz.token_set_ratio is a fuzzy string similarity measure that
+        #   ignores word order and focuses on word overlap.
+        # - score_cutoff lets RapidFuzz skip choices that cannot reach the
+        #   threshold, and makes extractOne return None below it.
+        # - process.extractOne returns: (matched_string, score, extra_info)
+        # The shortlist keeps corpus order, so ties resolve exactly as
+        # they would over the full list.
+        match = process.extractOne(
+            norm_query,
+            [self.choices[i] for i in candidates],
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=EXAM_SCORE_CUTOFF,
+        )
+
+        # No choice reached the threshold → the match would be unreliable.
+        if not match:
+            return None
+
+        # Convert the normalized match back to the original official
+        # exam name as it appears in the dataframe and return it.
+        norm_exam, score, _ = match
+        return self.norm_map[norm_exam], score
+
+    def match_many(self, exam_queries, top_k: int = 3):
+        """
+        Batch version of match(): score every query against the whole
+        corpus in one vectorized rapidfuzz cdist call (all CPU cores).
+
+        Returns one dict per query:
+            {"query", "match", "score", "alternatives": [{"name", "score"}, ...]}
+        "match" follows the same rules as match() (None below the cutoff).
+        """
+        top_k = max(1, top_k)
+        norm_queries = [
+            normalize_text(q) if isinstance(q, str) else "" for q in exam_queries
+        ]
+        scores = _score_matrix(norm_queries, self.choices)
+
+        results = []
+        for query, row in zip(exam_queries, scores):
+            ranked = _ranked_choices(row, top_k)
+            best_score = float(row[ranked[0]]) if ranked else 0.0
+            best = self.norm_map[self.choices[ranked[0]]] if ranked else None
+
+            results.append({
+                "query": query,
+                "match": best if best_score >= EXAM_SCORE_CUTOFF else None,
+                "score": best_score,
+                "alternatives": [
+                    {"name": self.norm_map[self.choices[i]], "score": float(row[i])}
+                    for i in ranked
+                ],
+            })
+        return results
+
+
+class _TokenIndex:
+    """
+    Token inverted index over normalized names, used to shortlist the
+    names worth scoring with fuzz.token_set_ratio.
+
+    token_set_ratio compares the SETS of words in two strings:
+      - shared words   (the intersection)
+      - leftover words on each side (the two differences)
+    and returns the best of three fuzz.ratio scores built from them.
+    Knowing only which words a name shares with the query (the posting
+    lists tell us) plus per-name word/character counts, we can put an
+    upper bound on that score without running it:
+      - the lengths of the shared and leftover words fix two of the
+        three ratios exactly and bound the third;
+      - the characters the leftover words have in common bound it
+        more tightly (this also covers names sharing no word at all).
+    A name whose bound is below the cutoff, or below the score of a
+    name we have already compared, can never be the match, so dropping
+    it gives exactly the full-scan answer.
+
+    Example:
+        "ct head without intravenous contrast" is compared with the few
+        names that share enough of its words or letters to still win,
+        instead of with every CT in the catalog.
+    """
+
+    # Float slack so a bound that equals the bar is never dropped
+    _EPS = 1e-6
+
+    def __init__(self, choices):
+        self._choices = choices
+        token_lists = [sorted(set(c.split())) for c in choices]
+
+        # Per name: number of distinct words and total word characters
+        self._tokens = np.array([len(t) for t in token_lists], dtype=np.int32)
+        letters = ["".join(t) for t in token_lists]
+        self._letters = np.array([len(s) for s in letters], dtype=np.int32)
+
+        # Length of the space-joined distinct words (what token_set_ratio
+        # compares), and the rows sorted by it for range lookups
+        self._lengths = np.where(self._tokens > 0, self._letters + self._tokens - 1, 0)
+        self._by_length = np.argsort(self._lengths, kind="stable")
+        self._sorted_lengths = self._lengths[self._by_length]
+
+        # Character counts of each name's distinct words (spaces excluded),
+        # one column per character seen in the catalog
+        codes = np.frombuffer("".join(letters).encode("utf-32-le"), dtype=np.uint32)
+        alphabet, columns = np.unique(codes, return_inverse=True)
+        self._columns = {chr(c): i for i, c in enumerate(alphabet.tolist())}
+        rows = np.repeat(np.arange(len(choices)), self._letters)
+        self._counts = np.bincount(
+            rows * len(alphabet) + columns, minlength=len(choices) * len(alphabet)
+        ).reshape(len(choices), len(alphabet)).astype(np.int16)
+
+        # word → sorted rows of the names containing it
+        token_ids = {}
+        flat_ids = [token_ids.setdefault(t, len(token_ids)) for tokens in token_lists for t in tokens]
+        flat_rows = np.repeat(np.arange(len(choices)), self._tokens)
+        order = np.argsort(np.array(flat_ids, dtype=np.int64), kind="stable")
+        splits = np.cumsum(np.bincount(np.array(flat_ids, dtype=np.int64), minlength=len(token_ids)))[:-1]
+        self.postings = dict(zip(token_ids, np.split(flat_rows[order], splits)))
+
+    def _char_vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(len(self._columns), dtype=np.int16)
+        for ch in text:
+            col = self._columns.get(ch)
+            if col is not None:
+                vec[col] += 1
+        return vec
+
+    def shortlist(self, norm_query: str, cutoff: float, seeds: int = 16) -> list:
+        """
+        Rows (in corpus order) that can still be the best match for
+        `norm_query` at `cutoff`. Every other row either scores below
+        the cutoff or cannot beat a name we already scored.
+
+        A few promising rows are scored up front (most shared letters,
+        then highest bound); the best of them raises the bar the rest
+        must reach, which is what keeps the shortlist small.
+        """
+        q_tokens = set(norm_query.split())
+        if not q_tokens:
+            return []  # token_set_ratio is 0 for an empty side
+
+        q = _QueryShape(self, q_tokens)
+        best = (cutoff, len(self._choices))  # (score to reach, row holding it)
+
+        # Seed: the names sharing the most letters with the query
+        best = self._score_top(norm_query, q.shared_letters, best, seeds, q.shared_rows)
+
+        # Pass 1: bound from word lengths alone, over the names sharing a
+        # word plus the others whose length alone does not rule them out
+        rows = q.candidate_rows(best[0] - self._EPS)
+        bound = q.bounds(rows)
+        rows, bound = self._keep(rows, bound, best)
+        best = self._score_top(norm_query, bound, best, seeds, rows)
+        rows, bound = self._keep(rows, bound, best)
+
+        # Pass 2: tighter bound from shared characters, survivors only
+        bound = q.bounds(rows, q.char_overlap(rows))
+        rows, bound = self._keep(rows, bound, best)
+        best = self._score_top(norm_query, bound, best, seeds, rows)
+        rows, _ = self._keep(rows, bound, best)
+        return rows.tolist()
+
+    def _score_top(self, norm_query, priority, best, seeds, rows):
+        """
+        Score the `seeds` rows with the highest priority and return the
+        updated (best score, first row with it). extractOne keeps the
+        first row among equal scores, so ties go to the lower row.
+        """
+        if len(rows) > seeds:
+            pick = np.argpartition(-priority, seeds)[:seeds]
+        else:
+            pick = np.arange(len(rows))
+
+        best_score, best_row = best
+        for row in rows[pick].tolist():
+            score = fuzz.token_set_ratio(norm_query, self._choices[row])
+            if score > best_score or (score == best_score and row < best_row):
+                best_score, best_row = score, row
+        return best_score, best_row
+
+    def _keep(self, rows, bound, best):
+        """
+        Drop rows that cannot be the answer: those whose bound is below
+        the best score, and those after the best row that can at most tie.
+        """
+        best_score, best_row = best
+        keep = (bound >= best_score - self._EPS) & (
+            (rows <= best_row) | (bound > best_score + self._EPS)
+        )
+        return rows[keep], bound[keep]
+
+
+class _QueryShape:
+    """
+    The query-side numbers _TokenIndex needs for its bounds, and the
+    bounds themselves. Built once per query.
+
+    Notation (lengths of space-joined word lists, as token_set_ratio
+    measures them): s = shared words, a = query-only words,
+    b = name-only words. With sect_a = s + 1 + a and sect_b = s + 1 + b:
+        ratio(sect, sect_a)     = 200 s / (s + sect_a)     (exact)
+        ratio(sect, sect_b)     = 200 s / (s + sect_b)     (exact)
+        ratio(sect_a, sect_b)  <= 100 (1 - (a + b - 2 o) / (sect_a + sect_b))
+    where o is any upper bound on the common characters of the a and b
+    word lists (min(a, b) to start with). With no shared words only the
+    last ratio is computed, over a and b alone.
+    """
+
+    def __init__(self, index: _TokenIndex, q_tokens: set):
+        self.index = index
+        self.count = len(q_tokens)
+        self.letters = sum(len(t) for t in q_tokens)
+        self.length = self.letters + self.count - 1
+        self.chars = index._char_vector("".join(q_tokens))
+        self.shared = [(t, index.postings[t]) for t in q_tokens if t in index.postings]
+
+        # Rows sharing at least one word, with how many words and letters
+        if self.shared:
+            n = len(index._lengths)
+            count = np.zeros(n, dtype=np.int64)
+            letters = np.zeros(n, dtype=np.int64)
+            for t, posting in self.shared:
+                count[posting] += 1
+                letters[posting] += len(t)
+            self.shared_rows = np.flatnonzero(count)
+            self.shared_count = count[self.shared_rows]
+            self.shared_letters = letters[self.shared_rows]
+        else:
+            self.shared_rows = np.empty(0, dtype=np.int64)
+            self.shared_count = np.empty(0, dtype=np.int64)
+            self.shared_letters = np.empty(0, dtype=np.int64)
+
+    def candidate_rows(self, bar: float):
+        """
+        Sorted rows worth bounding at `bar`: every row sharing a word,
+        plus rows sharing none whose length can still reach the bar.
+        With no shared word the score is at most 200 min(q, c) / (q + c)
+        for joined lengths q and c, which pins c to a range.
+        """
+        index = self.index
+        bar = max(bar, 1e-9)
+        lo = self.length * bar / (200.0 - bar) if bar < 200 else np.inf
+        hi = self.length * (200.0 - bar) / bar
+        start = np.searchsorted(index._sorted_lengths, lo, side="left")
+        stop = np.searchsorted(index._sorted_lengths, hi, side="right")
+        others = index._by_length[start:stop]
+        others = others[~np.isin(others, self.shared_rows, assume_unique=True)]
+        return np.sort(np.concatenate([self.shared_rows, others]))
+
+    def _shared(self, rows):
+        """(shared word count, shared letters) for each of `rows`."""
+        if not len(self.shared_rows):
+            zeros = np.zeros(len(rows), dtype=np.int64)
+            return zeros, zeros
+        at = np.minimum(np.searchsorted(self.shared_rows, rows), len(self.shared_rows) - 1)
+        hit = self.shared_rows[at] == rows
+        k = np.where(hit, self.shared_count[at], 0)
+        letters = np.where(hit, self.shared_letters[at], 0)
+        return k, letters
+
+    def bounds(self, rows, overlap=None):
+        """Upper bound on token_set_ratio for each of `rows`."""
+        index = self.index
+        k, sect_letters = self._shared(rows)
+        q_left = self.count - k
+        c_left = index._tokens[rows] - k
+
+        s = np.where(k > 0, sect_letters + k - 1, 0)
+        a = np.where(q_left > 0, self.letters - sect_letters + q_left - 1, 0)
+        b = np.where(c_left > 0, index._letters[rows] - sect_letters + c_left - 1, 0)
+        sep = (k > 0).astype(np.int32)
+        sect_a = s + sep + a
+        sect_b = s + sep + b
+
+        if overlap is None:
+            overlap = np.minimum(a, b)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bound = 100.0 * (1 - (a + b - 2 * overlap) / (sect_a + sect_b))
+            bound = np.maximum.reduce([
+                bound,
+                np.where(k > 0, 200.0 * s / (s + sect_a), 0.0),
+                np.where(k > 0, 200.0 * s / (s + sect_b), 0.0),
+            ])
+
+        # One word set contains the other → always 100
+        bound[(k > 0) & ((q_left == 0) | (c_left == 0))] = 100.0
+        # A name with no words always scores 0
+        bound[index._tokens[rows] == 0] = 0.0
+        return bound
+
+    def char_overlap(self, rows):
+        """
+        Upper bound on the common characters of the query-only and
+        name-only word lists (letters by count, plus separating spaces).
+        """
+        index = self.index
+
+        # Characters of the shared words, for these rows only
+        sect_chars = np.zeros((len(rows), len(self.chars)), dtype=np.int16)
+        for t, posting in self.shared:
+            at = np.searchsorted(rows, posting)
+            hit = at < len(rows)
+            hit[hit] = rows[at[hit]] == posting[hit]
+            sect_chars[at[hit]] += index._char_vector(t)
+
+        k, _ = self._shared(rows)
+        q_left = self.count - k
+        c_left = index._tokens[rows] - k
+        overlap = np.minimum(self.chars - sect_chars, index._counts[rows] - sect_chars).sum(axis=1)
+        return overlap + np.maximum(np.minimum(q_left, c_left) - 1, 0)
+
+
+def _score_matrix(norm_queries, choices):
+    """
+    token_set_ratio for every (query, choice) pair, shape (queries, choices).
+    Feeds repeat the same names a lot, so each distinct normalized query
+    is scored once and its row reused.
+    """
+    if not norm_queries or not choices:
+        return np.zeros((len(norm_queries), len(choices)), dtype=np.float64)
+
+    distinct = list(dict.fromkeys(norm_queries))
+    position = {q: i for i, q in enumerate(distinct)}
 
-def best_exam_match(exam_query: str):
+    scores = process.cdist(
+        distinct,
+        choices,
+        scorer=fuzz.token_set_ratio,
+        workers=-1,
+        dtype=np.float64,   # same precision as extractOne, so cutoffs agree
+    )
+    return scores[[position[q] for q in norm_queries]]
+
+
+def _ranked_choices(row, top_k: int):
+    """
+    Indices of the top_k scores, best first. Ties keep corpus order,
+    which is the same tie-break extractOne uses.
+    """
+    if len(row) == 0:
+        return []
+    return np.argsort(-row, kind="stable")[:top_k].tolist()
+
+
+def _cache_version(ds):
+    # loaded_at tells apart two loads of the same Parquet (e.g. a
+    # rollback to an earlier version), which are separate snapshots.
+    return ds.version, ds.loaded_at
+
+
+def best_exam_match(exam_query: str, ds=None):
     """
     Return the single best matching *official* exam name (string), or None.
 
@@ -41,6 +452,23 @@ def best_exam_match(exam_query: str):
 
     If the fuzzy match score is too low, we return None instead of
     guessing something that is probably wrong.
+
+    `ds` is the dataset snapshot to match against (defaults to the
+    current one); handlers pass theirs so a request uses one version.
+    The snapshot carries a prebuilt ExamMatcher for its exam names.
+
+    Results are cached per normalized query and dataset version
+    (see match_cache.py), so repeated phrases skip fuzzy scoring.
+    """
+
+    scored = exam_match_scored(exam_query, ds)
+    return scored[0] if scored else None
+
+
+def exam_match_scored(exam_query: str, ds=None):
+    """
+    Like best_exam_match, but return (official exam name, score) so
+    callers can judge how confident the match is. Shares its cache.
     """
 
     # If exam_query is not a string, or it's empty/only spaces,
@@ -48,71 +476,44 @@ def best_exam_match(exam_query: str):
     if not isinstance(exam_query, str) or not exam_query.strip():
         return None
 
-    # Normalize the user's text:
-    # - make lowercase
-    # - expand abbreviations (wo → without, iv → intravenous, etc.)
-    # - remove filler words like "exam" or "study"
-    norm_query = normalize_text(exam_query)
-
-    # Get all unique official exam names from the dataframe.
-    # Example values: "CT HEAD WO IV CONTRAST", "MRI BRAIN W DIAMOX", etc.
-    exams_original = df["EAP Name"].dropna().unique()
-
-    # Build a dictionary that maps a *normalized* version of each exam
-    # → back to the original official exam name.
-    #
-    # Example:
-    #   "ct head without intravenous contrast" → "CT HEAD WO IV CONTRAST"
-    #
-    # This lets us do fuzzy matching on the normalized keys, but still
-    # return the exact original string from the dataframe.
-    norm_map = {normalize_text(e): e for e in exams_original}
-
-    # The list of normalized exam names that we will compare against
-    # the normalized user query.
-    choices = list(norm_map.keys())
-
-    # Use RapidFuzz to find the single best match.
-    # - fuzz.token_set_ratio is a fuzzy string similarity measure that
-    #   ignores word order and focuses on word overlap.
-    # - process.extractOne returns: (matched_string, score, extra_info)
-    match = process.extractOne(
-        norm_query,
-        choices,
-        scorer=fuzz.token_set_ratio
+    ds = ds or get_dataset()
+    return match_cache.get_or_compute(
+        _cache_version(ds),
+        ("exam", normalize_text(exam_query)),
+        lambda: ds.exam_matcher.match_scored(exam_query),
     )
 
-    # If no match was found at all (very unlikely, but safe to check),
-    # then we return None.
-    if not match:
-        return None
+# The dataset uses "5TH", but users may type "fifth".
+# One compiled pattern replaces every spelled-out ordinal in one pass.
+# \b means "word boundary", so we only replace the whole word:
+# - "fifth" becomes "5th"
+# - but "fifthly" would NOT be changed
+NUMBER_WORDS = {
+    "first": "1st", "second": "2nd", "third": "3rd", "fourth": "4th",
+    "fifth": "5th", "sixth": "6th", "seventh": "7th", "eighth": "8th",
+    "ninth": "9th", "tenth": "10th"
+}
+_ORDINAL_PATTERN = re.compile(r"\b(" + "|".join(NUMBER_WORDS) + r")\b")
 
-    # Unpack the result.
-    # norm_exam  → the normalized exam string that matched
-    # score      → how similar it was to norm_query (0–100)
-    # _          → extra info we don't need here
-    norm_exam, score, _ = match
-
-    # If the similarity score is below our chosen threshold,
-    # we consider the match unreliable and return None.
-    #
-    # You can tune this value:
-    # - higher threshold → safer but more "no match" results
-    # - lower threshold  → more matches but risk of false positives
-    if score < 55:
-        return None
+# Minimum token_set_ratio score for a site match.
+# NOTE:
+# You may want slightly different thresholds for very short inputs
+# like "msm" or "hess". But start simple: one threshold.
+SITE_SCORE_CUTOFF = 60
+
+def normalize_site_text(s: str):
+    """Lowercase, trim, and turn spelled-out ordinals into numeric ones."""
+    q = s.lower().strip()
+    return _ORDINAL_PATTERN.sub(lambda m: NUMBER_WORDS[m.group(1)], q)
 
-    # Convert the normalized match back to the original official
-    # exam name as it appears in the dataframe and return it.
-    return norm_map[norm_exam]
 
-def best_site_match(site_query: str):
+class SiteMatcher:
     """
-    Return the best matching *official* site information based on the user's location text.
+    Prebuilt site search space for one dataset snapshot.
 
-    WHAT WE WANT NOW (UPDATED REQUIREMENT):
-    --------------------------------------
-    We want fuzzy matching to consider BOTH:
+    WHAT WE MATCH AGAINST:
+    ----------------------
+    Fuzzy matching considers BOTH:
       1) the canonical location prefixes themselves
          (example: "10 UNION SQ E", "1176 5TH AVE", "MSM")
       2) the human-friendly aliases for those prefixes
@@ -123,16 +524,179 @@ def best_site_match(site_query: str):
         do NOT resemble the canonical prefix "10 UNION SQ E" closely enough.
       - Fuzzy matching only against prefixes will miss those cases.
 
-    How this function works now:
+    The search space depends on LOCATION_TO_DEPARTMENTS, so it is built
+    once per snapshot (data_loader attaches one to each) and is replaced
+    whenever the dataset is reloaded.
+    """
+
+    def __init__(self, location_to_departments: dict, location_prefixes: dict):
+        # LOCATION_TO_DEPARTMENTS is a dictionary built in data_loader.py:
+        #   canonical_prefix (string) -> list of DEP Names (strings)
+        #
+        # Example:
+        #   "1176 5TH AVE" -> ["1176 5TH AVE RAD CT", "1176 5TH AVE RAD MRI", ...]
+        self.location_to_departments = location_to_departments
+
+        # Build ONE "search space" that includes:
+        #   - prefixes
+        #   - aliases
+        # and maps every searchable phrase -> a canonical prefix:
+        #
+        #   "10 union sq e"   -> "10 UNION SQ E"
+        #   "union square"    -> "10 UNION SQ E"
+        #   "hess"            -> "1470 MADISON AVE"
+        #
+        # RapidFuzz returns the best matching searchable string and we
+        # then look up which canonical prefix that string belongs to.
+        self.searchable_to_prefix = {}
+
+        # Always include the canonical prefixes themselves in the search space.
+        # This ensures users can type "10 UNION SQ E" directly and still match.
+        for prefix in location_to_departments.keys():
+            self.searchable_to_prefix[prefix.lower()] = prefix
+
+        # Include all aliases (human-friendly names) in the search space.
+        # LOCATION_PREFIXES looks like:
+        #   { "10 UNION SQ E": ["union square", "union sq", ...], ... }
+        #
+        # IMPORTANT: we only add aliases for prefixes that exist in
+        # LOCATION_TO_DEPARTMENTS. That prevents typos or unused prefixes
+        # in the alias file from breaking matches.
+        for prefix, aliases in location_prefixes.items():
+            if prefix not in location_to_departments:
+                continue
+
+            for alias in aliases:
+                if not isinstance(alias, str):
+                    continue
+                alias_norm = alias.lower().strip()
+                if alias_norm:
+                    self.searchable_to_prefix[alias_norm] = prefix
+
+        # The list RapidFuzz will compare against
+        self.choices = list(self.searchable_to_prefix.keys())
+
+        # Exact lookup table: searchable phrase with whitespace collapsed.
+        # A query that IS a known prefix or alias never needs fuzzy scoring.
+        self.exact = {
+            " ".join(text.split()): prefix
+            for text, prefix in self.searchable_to_prefix.items()
+        }
+
+    def match_prefix(self, site_query: str):
+        """Return the canonical location prefix for `site_query`, or None."""
+        scored = self.match_prefix_scored(site_query)
+        return scored[0] if scored else None
+
+    def match_prefix_scored(self, site_query: str):
+        """Return (canonical location prefix, score) for `site_query`, or None."""
+        q = normalize_site_text(site_query)
+
+        # Exact prefix/alias hit → done, no fuzzy scoring needed
+        exact = self.exact.get(" ".join(q.split()))
+        if exact:
+            return exact, 100.0
+
+        if not self.choices:
+            return None
+
+        # extractOne returns:
+        #   (best_matching_choice_string, similarity_score, extra_info)
+        #
+        # token_set_ratio:
+        # - ignores word order
+        # - focuses on word overlap
+        # - works well for short location phrases
+        match = process.extractOne(
+            q,
+            self.choices,
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=SITE_SCORE_CUTOFF,
+        )
+
+        # If the best score is below the cutoff, the match is probably unreliable.
+        if not match:
+            return None
+
+        matched_text, score, _ = match
+        return self.searchable_to_prefix[matched_text], score
+
+    def match_many(self, site_queries, top_k: int = 3):
+        """
+        Batch version of match(): one vectorized cdist call for all queries.
+
+        Returns one dict per query:
+            {"query", "match", "score", "departments", "alternatives": [{"name", "score"}, ...]}
+        where names are canonical location prefixes.
+        """
+        top_k = max(1, top_k)
+        norm_queries = [
+            normalize_site_text(q) if isinstance(q, str) else "" for q in site_queries
+        ]
+        scores = _score_matrix(norm_queries, self.choices)
+
+        results = []
+        for query, q, row in zip(site_queries, norm_queries, scores):
+            # Several searchable strings point at the same prefix; keep
+            # the best-scoring one per prefix.
+            alternatives = []
+            for i in _ranked_choices(row, len(self.choices)):
+                prefix = self.searchable_to_prefix[self.choices[i]]
+                if all(a["name"] != prefix for a in alternatives):
+                    alternatives.append({"name": prefix, "score": float(row[i])})
+                if len(alternatives) >= top_k:
+                    break
+
+            exact = self.exact.get(" ".join(q.split()))
+            if exact:
+                best, best_score = exact, 100.0
+            elif alternatives and alternatives[0]["score"] >= SITE_SCORE_CUTOFF:
+                best, best_score = alternatives[0]["name"], alternatives[0]["score"]
+            else:
+                best, best_score = None, (alternatives[0]["score"] if alternatives else 0.0)
+
+            deps = self.location_to_departments.get(best, []) if best else []
+            results.append({
+                "query": query,
+                "match": best if deps else None,
+                "score": best_score,
+                "departments": deps,
+                "alternatives": alternatives,
+            })
+        return results
+
+    def match(self, site_query: str):
+        """Return (canonical_prefix, [official DEP Names]) or None."""
+        scored = self.match_scored(site_query)
+        return scored[:2] if scored else None
+
+    def match_scored(self, site_query: str):
+        """Return (canonical_prefix, [official DEP Names], score) or None."""
+        scored = self.match_prefix_scored(site_query)
+        if not scored:
+            return None
+        best_prefix, score = scored
+
+        # Expand the canonical prefix into official DEP Names.
+        # If this is empty, it likely means a configuration mismatch.
+        deps = self.location_to_departments.get(best_prefix, [])
+        if not deps:
+            return None
+
+        return best_prefix, deps, score
+
+
+def best_site_match(site_query: str, ds=None):
+    """
+    Return the best matching *official* site information based on the user's location text.
+
+    How this function works:
       1) Normalize the user's text (lowercase, handle "fifth" → "5th", etc.)
-      2) Build a searchable list containing:
-           - every prefix
-           - every alias
-         BUT each searchable string points back to ONE canonical prefix.
-      3) Fuzzy-match the user's query against that searchable list.
-      4) Convert the winning match into the canonical prefix.
-      5) Expand the canonical prefix into official department names via LOCATION_TO_DEPARTMENTS.
-      6) Return those department names as a list.
+      2) If the text is exactly a known prefix or alias, use it directly.
+      3) Otherwise fuzzy-match it against every prefix and alias
+         (see SiteMatcher), each of which points back to ONE canonical prefix.
+      4) Expand the canonical prefix into official department names via LOCATION_TO_DEPARTMENTS.
+      5) Return (canonical_prefix, [department names]).
 
     IMPORTANT SAFETY GUARANTEE:
       - We still return ONLY official department names that exist in the dataset.
@@ -145,177 +709,35 @@ def best_site_match(site_query: str):
       - "10 union sq e" → canonical prefix "10 UNION SQ E" → ["10 UNION SQ E RAD MRI", ...]
       - "1176 fifth ave"→ canonical prefix "1176 5TH AVE"  → [CT, MRI, XRAY, ...]
       - "random words"  → None (no confident match)
-    """
 
-    # ---------------------------------------------------------
-    # 0) Defensive programming: validate input
-    # ---------------------------------------------------------
-    # If site_query is not a string (ex: None, number, list), or is just spaces,
-    # then we cannot do meaningful matching.
-    if not isinstance(site_query, str) or not site_query.strip():
-        return None
+    `ds` is the dataset snapshot to match against (defaults to the current one).
+    Results are cached per normalized query and dataset version.
+    """
 
-    # ---------------------------------------------------------
-    # 1) Normalize the user's text
-    # ---------------------------------------------------------
-    # Convert to lowercase so capitalization differences do not matter.
-    # Remove leading/trailing spaces so accidental spaces do not matter.
-    q = site_query.lower().strip()
-
-    # ---------------------------------------------------------
-    # 2) Convert spelled-out ordinals into numeric ordinals
-    # ---------------------------------------------------------
-    # The dataset uses "5TH", but users may type "fifth".
-    # This replacement increases match accuracy.
-    number_words = {
-        "first": "1st", "second": "2nd", "third": "3rd", "fourth": "4th",
-        "fifth": "5th", "sixth": "6th", "seventh": "7th", "eighth": "8th",
-        "ninth": "9th", "tenth": "10th"
-    }
-
-    for word, num in number_words.items():
-        # \b means "word boundary", so we only replace the whole word:
-        # - "fifth" becomes "5th"
-        # - but "fifthly" would NOT be changed
-        q = re.sub(rf"\b{word}\b", num, q)
-
-    # ---------------------------------------------------------
-    # 3) Collect the canonical location prefixes
-    # ---------------------------------------------------------
-    # LOCATION_TO_DEPARTMENTS is a dictionary built in data_loader.py:
-    #   canonical_prefix (string) -> list of DEP Names (strings)
-    #
-    # Example:
-    #   "1176 5TH AVE" -> ["1176 5TH AVE RAD CT", "1176 5TH AVE RAD MRI", ...]
-    prefixes_original = list(LOCATION_TO_DEPARTMENTS.keys())
-
-    # If this list is empty, we have no location data to match against.
-    if not prefixes_original:
-        return None
+    scored = site_match_scored(site_query, ds)
+    return scored[:2] if scored else None
 
-    # ---------------------------------------------------------
-    # 4) Build ONE "search space" that includes:
-    #       - prefixes
-    #       - aliases
-    #    and maps every searchable phrase -> a canonical prefix
-    # ---------------------------------------------------------
-    # We will create a dictionary:
-    #
-    #   searchable_string_lowercase -> canonical_prefix_original_case
-    #
-    # Example:
-    #   "10 union sq e"   -> "10 UNION SQ E"
-    #   "union square"    -> "10 UNION SQ E"
-    #   "hess"            -> "1470 MADISON AVE"
-    #
-    # The reason we do this:
-    # - RapidFuzz will return the best matching searchable string.
-    # - We then look up which canonical prefix that string belongs to.
-    #
-    # Where do the aliases come from?
-    # - OPTION A (recommended): if you have LOCATION_PREFIXES dict:
-    #       LOCATION_PREFIXES = { prefix: [aliases...] }
-    # - OPTION B: if you have a separate aliases dict, adapt similarly.
-    #
-    # This code assumes OPTION A: LOCATION_PREFIXES exists.
-    # If you have not created LOCATION_PREFIXES yet, you should.
-    searchable_to_prefix = {}
-
-    # 4A) Always include the canonical prefixes themselves in the search space.
-    # This ensures users can type "10 UNION SQ E" directly and still match.
-    for prefix in prefixes_original:
-        searchable_to_prefix[prefix.lower()] = prefix
-
-    # 4B) Include all aliases (human-friendly names) in the search space.
-    #
-    # LOCATION_PREFIXES is expected to look like:
-    #   {
-    #     "10 UNION SQ E": ["union square", "union sq", ...],
-    #     "1470 MADISON AVE": ["hess", "madison ave", ...],
-    #     ...
-    #   }
-    #
-    # Each alias maps back to the SAME canonical prefix.
-    #
-    # IMPORTANT: we only add aliases for prefixes that exist in LOCATION_TO_DEPARTMENTS.
-    # That prevents typos or unused prefixes in the alias file from breaking matches.
-    for prefix, aliases in LOCATION_PREFIXES.items():
-        if prefix not in LOCATION_TO_DEPARTMENTS:
-            # This means your alias file contains a prefix that doesn't exist
-            # in your computed prefix->departments map.
-            # We skip it to avoid returning invalid prefixes.
-            continue
-
-        # Add each alias as a searchable string that resolves to this prefix.
-        for alias in aliases:
-            if not isinstance(alias, str):
-                continue
-            alias_norm = alias.lower().strip()
-            if alias_norm:
-                searchable_to_prefix[alias_norm] = prefix
 
-    # The list RapidFuzz will compare against:
-    choices = list(searchable_to_prefix.keys())
+def site_match_scored(site_query: str, ds=None):
+    """
+    Like best_site_match, but return (canonical_prefix, [DEP Names], score);
+    an exact prefix/alias hit scores 100. Shares its cache.
+    """
 
-    # If for some reason choices is empty, we cannot match anything.
-    if not choices:
+    # If site_query is not a string (ex: None, number, list), or is just spaces,
+    # then we cannot do meaningful matching.
+    if not isinstance(site_query, str) or not site_query.strip():
         return None
 
-    # ---------------------------------------------------------
-    # 5) Fuzzy-match the user's query against BOTH prefixes + aliases
-    # ---------------------------------------------------------
-    # extractOne returns:
-    #   (best_matching_choice_string, similarity_score, extra_info)
-    #
-    # token_set_ratio:
-    # - ignores word order
-    # - focuses on word overlap
-    # - works well for short location phrases
-    match = process.extractOne(
-        q,
-        choices,
-        scorer=fuzz.token_set_ratio
+    # Whitespace is collapsed for the key: token_set_ratio and the
+    # exact alias lookup both ignore it.
+    ds = ds or get_dataset()
+    return match_cache.get_or_compute(
+        _cache_version(ds),
+        ("site", " ".join(normalize_site_text(site_query).split())),
+        lambda: ds.site_matcher.match_scored(site_query),
     )
 
-    if not match:
-        return None
-
-    matched_text, score, _ = match
-
-    # ---------------------------------------------------------
-    # 6) Confidence threshold
-    # ---------------------------------------------------------
-    # If score is low, the match is probably unreliable.
-    #
-    # NOTE:
-    # You may want slightly different thresholds for very short inputs
-    # like "msm" or "hess". But start simple: one threshold.
-    if score < 60:
-        return None
-
-    # ---------------------------------------------------------
-    # 7) Convert the matched text into the canonical prefix
-    # ---------------------------------------------------------
-    # matched_text is something like:
-    #   "union square"  OR  "10 union sq e"  OR  "1176 5th ave"
-    #
-    # searchable_to_prefix tells us the canonical prefix for that text:
-    best_prefix = searchable_to_prefix[matched_text]
-
-    # ---------------------------------------------------------
-    # 8) Expand the canonical prefix into official DEP Names
-    # ---------------------------------------------------------
-    # LOCATION_TO_DEPARTMENTS[best_prefix] is the list of all official departments
-    # at that location.
-    deps = LOCATION_TO_DEPARTMENTS.get(best_prefix, [])
-
-    # If this is empty, it likely means a configuration mismatch.
-    if not deps:
-        return None
-
-    # Return official department names (always a list).
-    return best_prefix, deps
-
 # Old site matching function 
 # def best_site_match(site_query: str):
 #     """
@@ -0,0 +1,168 @@
+# -------------------------------------------------------------
+# ingestion_jobs.py
+# -------------------------------------------------------------
+# Purpose:
+#   Background job queue for /upload. Parsing a large PDF, embedding
+#   its chunks and inserting them used to run inside the request (and
+#   on the event loop); now /upload only saves the file, enqueues an
+#   IngestionJob and returns its id.
+#
+#   - A pool of INGEST_WORKERS threads runs the jobs, stage by stage
+#     (parse → chunk → embed → insert → index). Each stage sees the
+#     results of the previous ones in job.state.
+#   - A failing stage is retried up to INGEST_STAGE_RETRIES times with
+#     exponential backoff (INGEST_RETRY_BACKOFF, doubled per attempt);
+#     then the job fails and keeps the error. Stages declared as
+#     (name, fn, False) are never retried: a non-idempotent write (the
+#     Supabase insert) and anything after it must not run twice.
+#   - GET /jobs/{id} → job.to_dict(): status, current stage, per-stage
+#     status / attempts / timings. The last INGEST_JOB_HISTORY jobs are
+#     kept in memory (per process; lost on restart).
+# -------------------------------------------------------------
+
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import metrics
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_STAGE_RETRIES = int(os.getenv("INGEST_STAGE_RETRIES", "2"))
+INGEST_RETRY_BACKOFF = float(os.getenv("INGEST_RETRY_BACKOFF", "1.0"))   # seconds
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "500"))
+
+
+class IngestionJob:
+    def __init__(self, stages: list, info: dict = None):
+        self.id = uuid.uuid4().hex
+        # [(name, fn(state) → dict of new state[, retry=True])]
+        self.stages = [(stage[0], stage[1], stage[2] if len(stage) > 2 else True) for stage in stages]
+        self.info = dict(info or {})    # shown in the status (file name, path, ...)
+        self.state = {}
+        self.status = "queued"          # queued → running → done | failed
+        self.stage = None
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {
+            name: {"status": "pending", "attempts": 0, "seconds": None, "error": None}
+            for name, _, _ in self.stages
+        }
+
+    def to_dict(self) -> dict:
+        def elapsed(start, end):
+            return round(end - start, 3) if start and end else None
+
+        done = sum(1 for p in self.progress.values() if p["status"] == "done")
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(done / len(self.stages), 2) if self.stages else 1.0,
+            "stages": {name: dict(p) for name, p in self.progress.items()},
+            "info": self.info,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "queued_seconds": elapsed(self.created_at, self.started_at),
+            "total_seconds": elapsed(self.started_at, self.finished_at),
+        }
+
+
+class IngestionQueue:
+    def __init__(
+        self,
+        workers: int = INGEST_WORKERS,
+        retries: int = INGEST_STAGE_RETRIES,
+        backoff: float = INGEST_RETRY_BACKOFF,
+        history: int = INGEST_JOB_HISTORY,
+    ):
+        self.workers = max(1, workers)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.history = history
+        self._jobs = OrderedDict()      # id → IngestionJob, oldest first
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def submit(self, stages: list, info: dict = None) -> IngestionJob:
+        job = IngestionJob(stages, info)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="ingest")
+            self._jobs[job.id] = job
+            self._forget_finished()
+        metrics.incr("ingest.jobs.queued")
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _forget_finished(self):
+        # Oldest finished jobs go first; queued / running ones are kept
+        excess = len(self._jobs) - self.history
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def _run_stage(self, job: IngestionJob, name: str, fn, retry: bool):
+        progress = job.progress[name]
+        progress["status"] = "running"
+        started = time.perf_counter()
+        while True:
+            progress["attempts"] += 1
+            try:
+                job.state.update(fn(job.state) or {})
+                break
+            except Exception as e:
+                progress["error"] = str(e)
+                if not retry or progress["attempts"] > self.retries:
+                    progress["status"] = "failed"
+                    progress["seconds"] = round(time.perf_counter() - started, 3)
+                    raise
+                metrics.incr(f"ingest.retries.{name}")
+                print(f"⚠️ Ingestion job {job.id} {name} failed (attempt {progress['attempts']}): {e}")
+                time.sleep(self.backoff * 2 ** (progress["attempts"] - 1))
+
+        seconds = time.perf_counter() - started
+        progress.update(status="done", seconds=round(seconds, 3), error=None)
+        metrics.observe(f"ingest.stage.{name}", seconds)
+
+    def _run(self, job: IngestionJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            for name, fn, retry in job.stages:
+                job.stage = name
+                self._run_stage(job, name, fn, retry)
+            job.status = "done"
+            job.stage = None
+            metrics.incr("ingest.jobs.done")
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{job.stage}: {e}"
+            metrics.incr("ingest.jobs.failed")
+            print(f"❌ Ingestion job {job.id} failed at {job.stage}: {e}")
+        finally:
+            # Also kept on failure: a failed index stage still inserted the rows
+            job.result = job.state.get("result")
+            job.finished_at = time.time()
+            # The parsed text / embeddings are not needed once the job ended
+            job.state = {}
+            metrics.observe("ingest.total", job.finished_at - job.started_at)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "retries": self.retries, "jobs": counts}
+
+
+ingestion_queue = IngestionQueue()
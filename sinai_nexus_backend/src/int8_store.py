@@ -0,0 +1,246 @@
+# -------------------------------------------------------------
+# int8_store.py
+# -------------------------------------------------------------
+# Purpose:
+#   Compact embedding storage for the in-process vector index.
+#
+#   Int8Vectors keeps each unit-norm 384-d row as int8 codes plus one
+#   float32 scale (row ≈ codes * scale, scale = max|row| / 127):
+#   388 bytes per chunk instead of 1,536 for float32.
+#   Similarity is one int8 × float32 dot product per row (einsum,
+#   no float copy of the matrix) times the row scale.
+#
+#   Optional float re-rank: the exact float32 rows are also written to
+#   a spill file that is memory-mapped and unlinked right away, so they
+#   live in the OS page cache (evictable, not process heap) and vanish
+#   with the process. Only the top candidates are read back from it to
+#   recompute their exact distances. Rows uploaded after a load go to a
+#   RAM tail, bounded by compaction on delete and a re-spill once it
+#   exceeds the tail limit (VECTOR_INDEX_SPILL_TAIL_MB).
+#
+#   FloatVectors is the plain float32 matrix with the same interface
+#   (VECTOR_INDEX_STORAGE=float32).
+#
+#   benchmarks/bench_quantized_index.py reports recall@k against exact
+#   float search and the memory for 100k chunks.
+# -------------------------------------------------------------
+
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# Float rows appended after a load that may stay in RAM before they are spilled
+DEFAULT_TAIL_LIMIT = 32 * 1024 * 1024
+
+
+def quantize_rows(matrix: np.ndarray):
+    """Symmetric per-row int8 quantization → (codes, scales)."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class FloatVectors:
+    """Exact float32 rows."""
+
+    approximate = False
+    can_rerank = False
+    spill_bytes = 0
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def similarity(self, q: np.ndarray) -> np.ndarray:
+        return self.matrix @ q
+
+    def extend(self, matrix: np.ndarray) -> "FloatVectors":
+        return FloatVectors(np.vstack([self.matrix, matrix]))
+
+    def select(self, keep: np.ndarray) -> "FloatVectors":
+        return FloatVectors(self.matrix[keep])
+
+
+class _FloatSpill:
+    """
+    Append-only float32 rows addressed by slot: the bulk in an unlinked
+    memory-mapped file, later appends (uploads) in a RAM tail. Older
+    index versions only reference older slots, so versions can share it.
+
+    The tail is bounded: deletes drop the tail rows nobody references
+    any more (compact), and once it exceeds `tail_limit` bytes the live
+    rows are written to a fresh spill file (respill). Both return a new
+    spill, so index versions still serving searches are untouched.
+    """
+
+    def __init__(self, base: np.ndarray, tail: np.ndarray, spill_dir: str, tail_limit: int):
+        self._base = base
+        self._tail = tail
+        self.spill_dir = spill_dir
+        self.tail_limit = tail_limit
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, matrix: np.ndarray, spill_dir: str, tail_limit: int) -> "_FloatSpill":
+        tail = np.zeros((0, matrix.shape[1]), dtype=np.float32)
+        return cls(cls._spill(matrix, spill_dir), tail, spill_dir, tail_limit)
+
+    @staticmethod
+    def _spill(matrix: np.ndarray, spill_dir: str):
+        if not spill_dir or matrix.size == 0:
+            return matrix
+        os.makedirs(spill_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="vector_index_", suffix=".f32", dir=spill_dir)
+        os.close(fd)
+        try:
+            mapped = np.memmap(path, dtype=np.float32, mode="w+", shape=matrix.shape)
+            mapped[:] = matrix
+            mapped.flush()
+        finally:
+            # The mapping stays valid; the file is reclaimed once unmapped
+            os.unlink(path)
+        return mapped
+
+    def __len__(self):
+        return len(self._base) + len(self._tail)
+
+    @property
+    def spill_bytes(self) -> int:
+        return self._base.nbytes if isinstance(self._base, np.memmap) else 0
+
+    @property
+    def ram_bytes(self) -> int:
+        return self._tail.nbytes + (0 if isinstance(self._base, np.memmap) else self._base.nbytes)
+
+    def append(self, matrix: np.ndarray) -> np.ndarray:
+        with self._lock:
+            first = len(self)
+            self._tail = np.vstack([self._tail, matrix])
+            return np.arange(first, first + len(matrix), dtype=np.int64)
+
+    def take(self, slots: np.ndarray) -> np.ndarray:
+        n_base = len(self._base)
+        in_base = slots < n_base
+        out = np.empty((len(slots), self._base.shape[1]), dtype=np.float32)
+        out[in_base] = self._base[slots[in_base]]
+        out[~in_base] = self._tail[slots[~in_base] - n_base]
+        return out
+
+    def compact(self, slots: np.ndarray):
+        """(spill, slots) whose tail holds only the rows `slots` references."""
+        n_base = len(self._base)
+        in_tail = slots >= n_base
+        live = np.unique(slots[in_tail])
+        if len(live) == len(self._tail):
+            return self, slots
+        remap = np.empty(len(self._tail), dtype=np.int64)
+        remap[live - n_base] = np.arange(n_base, n_base + len(live))
+        slots = slots.copy()
+        slots[in_tail] = remap[slots[in_tail] - n_base]
+        tail = self._tail[live - n_base]
+        return _FloatSpill(self._base, tail, self.spill_dir, self.tail_limit), slots
+
+    def bounded(self, slots: np.ndarray):
+        """(spill, slots), moved to a fresh spill file if the tail outgrew tail_limit."""
+        if not self.spill_dir or self._tail.nbytes <= self.tail_limit:
+            return self, slots
+        spill = _FloatSpill.create(self.take(slots), self.spill_dir, self.tail_limit)
+        return spill, np.arange(len(slots), dtype=np.int64)
+
+
+class Int8Vectors:
+    """int8 codes + per-row scales, with an optional exact re-rank source."""
+
+    approximate = True
+
+    def __init__(self, codes, scales, slots=None, spill=None):
+        self.codes = codes
+        self.scales = scales
+        self.slots = slots      # row → slot in `spill` (None without re-rank)
+        self.spill = spill
+
+    @classmethod
+    def build(
+        cls, matrix: np.ndarray, rerank: bool, spill_dir: str = "", tail_limit: int = DEFAULT_TAIL_LIMIT
+    ) -> "Int8Vectors":
+        codes, scales = quantize_rows(matrix)
+        if not rerank:
+            return cls(codes, scales)
+        spill = _FloatSpill.create(matrix, spill_dir, tail_limit)
+        return cls(codes, scales, np.arange(len(matrix), dtype=np.int64), spill)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def dim(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def can_rerank(self) -> bool:
+        return self.spill is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Process memory: codes, scales, slots and any in-RAM float rows."""
+        total = self.codes.nbytes + self.scales.nbytes
+        if self.spill is not None:
+            total += self.slots.nbytes + self.spill.ram_bytes
+        return total
+
+    @property
+    def spill_bytes(self) -> int:
+        return self.spill.spill_bytes if self.spill is not None else 0
+
+    def similarity(self, q: np.ndarray) -> np.ndarray:
+        # einsum reads the int8 codes directly instead of first
+        # materializing a float32 copy of the whole matrix
+        return np.einsum("ij,j->i", self.codes, q) * self.scales
+
+    def exact_similarity(self, rows: np.ndarray, q: np.ndarray) -> np.ndarray:
+        return self.spill.take(self.slots[rows]) @ q
+
+    def extend(self, matrix: np.ndarray) -> "Int8Vectors":
+        codes, scales = quantize_rows(matrix)
+        slots = spill = None
+        if self.spill is not None:
+            slots = np.concatenate([self.slots, self.spill.append(matrix)])
+            spill, slots = self.spill.bounded(slots)
+        return Int8Vectors(
+            np.vstack([self.codes, codes]), np.concatenate([self.scales, scales]), slots, spill
+        )
+
+    def select(self, keep: np.ndarray) -> "Int8Vectors":
+        if self.spill is None:
+            return Int8Vectors(self.codes[keep], self.scales[keep])
+        # Float rows of deleted uploads are released, not kept until the next reload
+        spill, slots = self.spill.compact(self.slots[keep])
+        return Int8Vectors(self.codes[keep], self.scales[keep], slots, spill)
+
+
+def make_vectors(
+    matrix: np.ndarray,
+    storage: str = "int8",
+    rerank: bool = True,
+    spill_dir: str = "",
+    tail_limit: int = DEFAULT_TAIL_LIMIT,
+):
+    """Vector storage for unit-norm float32 rows: "int8" or "float32"."""
+    if storage == "float32":
+        return FloatVectors(matrix)
+    if storage == "int8":
+        return Int8Vectors.build(matrix, rerank, spill_dir, tail_limit)
+    raise RuntimeError(f"Unknown VECTOR_INDEX_STORAGE {storage!r}; expected 'int8' or 'float32'")
@@ -0,0 +1,207 @@
+# -------------------------------------------------------------
+# intent_rules.py
+# -------------------------------------------------------------
+# Purpose:
+#   Deterministic "fast path" in front of Gemini for formulaic
+#   scheduling questions, e.g.
+#       "where is CT head wo done"         → locations_for_exam
+#       "how long is CT head wo contrast"  → exam_duration
+#       "which rooms at hess do ct head"   → rooms_for_exam_at_site
+#
+#   Each template is an anchored regex for one of the six intents
+#   with named groups for the exam and/or site text. A parse is
+#   only trusted when:
+#     1) a template matches the WHOLE question, and
+#     2) every extracted span resolves through the fuzzy matchers
+#        with a confidence of at least FAST_PATH_MIN_CONFIDENCE.
+#   Anything else returns None and the router falls back to Gemini.
+#
+#   The matchers score with token_set_ratio, which gives 100 to any
+#   span whose words are a subset of a name ("mri" → hundreds of
+#   exams), so a span's confidence is that score times the share of
+#   the matched name's words the span actually contains.
+#
+#   The output has the same shape as interpret_scheduling_query,
+#   so the handlers do not care which parser produced it.
+# -------------------------------------------------------------
+
+import os
+import re
+
+from src.data_loader import get_dataset
+from src.fuzzy_matchers import (
+    exam_match_scored,
+    site_match_scored,
+    normalize_text,
+    normalize_site_text,
+)
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# The intents the router has a handler for (query_router.resolve_scheduling_answer)
+SCHEDULING_INTENTS = frozenset({
+    "exam_at_site",
+    "locations_for_exam",
+    "exams_at_site",
+    "exam_duration",
+    "rooms_for_exam_at_site",
+    "rooms_for_exam",
+})
+
+# Minimum confidence (matcher score × name coverage, 0-100) for an
+# extracted exam/site span: "ct head wo" → CT HEAD WO IV CONTRAST covers
+# 3 of its 5 words (60) and passes, "ct head" (40) goes to Gemini. Below
+# this we would rather pay for a Gemini call than guess the entity.
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "60"))
+
+# Building blocks shared by the templates
+_ART = r"(?:(?:an?|the) )?"
+_DONE = r"(?:done|performed|offered|available|scheduled|booked)"
+_DO = r"(?:do|does|perform|performs|offer|offers|have|has|schedule|schedules)"
+_EXAMS = r"(?:exams|studies|procedures|scans|tests|imaging)"
+_ROOMS = r"rooms?"
+_AT = r"(?:at|in)"
+
+# (intent, pattern). Order matters: the first template that matches wins,
+# so the "at a site" forms come before their site-less versions.
+_TEMPLATES = [
+    # --- exam_duration ---
+    ("exam_duration", rf"how long (?:is |does |do |will |would )?{_ART}(?P<exam>.+?)(?: take| takes| last| lasts| usually take)?"),
+    ("exam_duration", rf"how many minutes (?:is|does|for|are) {_ART}(?P<exam>.+?)(?: take)?"),
+    ("exam_duration", rf"(?:what is |what's |whats )?(?:the )?(?:visit )?(?:duration|length|time) (?:of|for) {_ART}(?P<exam>.+)"),
+
+    # --- rooms_for_exam_at_site ---
+    ("rooms_for_exam_at_site", rf"(?:which|what) {_ROOMS} {_AT} (?P<site>.+?) (?:can )?{_DO} {_ART}(?P<exam>.+)"),
+    ("rooms_for_exam_at_site", rf"(?:which|what) {_ROOMS} (?:can )?(?:{_DO}|are used for|is used for|for) {_ART}(?P<exam>.+?) {_AT} (?P<site>.+)"),
+    ("rooms_for_exam_at_site", rf"(?:which|what) {_ROOMS} (?:is|are|can) {_ART}(?P<exam>.+?) (?:be )?{_DONE} {_AT} (?P<site>.+)"),
+    ("rooms_for_exam_at_site", rf"{_ROOMS} for {_ART}(?P<exam>.+?) {_AT} (?P<site>.+)"),
+
+    # --- rooms_for_exam ---
+    ("rooms_for_exam", rf"(?:which|what) {_ROOMS} (?:can )?(?:{_DO}|are used for|is used for|for) {_ART}(?P<exam>.+)"),
+    ("rooms_for_exam", rf"(?:which|what) {_ROOMS} (?:is|are|can) {_ART}(?P<exam>.+?) (?:be )?{_DONE}(?: in)?"),
+    ("rooms_for_exam", rf"{_ROOMS} for {_ART}(?P<exam>.+)"),
+
+    # --- exams_at_site ---
+    ("exams_at_site", rf"(?:what|which) {_EXAMS} (?:are |can be |is )?(?:{_DONE} )?{_AT} (?P<site>.+)"),
+    ("exams_at_site", rf"(?:what|which) {_EXAMS} (?:does|do|can) (?P<site>.+?) {_DO}"),
+    ("exams_at_site", rf"what (?:does|do|can) (?P<site>.+?) {_DO}"),
+    ("exams_at_site", rf"(?:list|show)(?: me)?(?: all)?(?: the)? {_EXAMS} (?:{_DONE} )?(?:at|in|for) (?P<site>.+)"),
+    ("exams_at_site", rf"{_EXAMS} (?:{_DONE} )?{_AT} (?P<site>.+)"),
+
+    # --- exam_at_site ---
+    ("exam_at_site", rf"(?:is|are|can|could) {_ART}(?P<exam>.+?) (?:be )?{_DONE} {_AT} (?P<site>.+)"),
+    ("exam_at_site", rf"(?:does|do|can) (?P<site>.+?) {_DO} {_ART}(?P<exam>.+)"),
+    ("exam_at_site", rf"can (?:i|we|you|a patient|patients) (?:get|schedule|book|do) {_ART}(?P<exam>.+?) {_AT} (?P<site>.+)"),
+
+    # --- locations_for_exam ---
+    ("locations_for_exam", rf"where (?:is|are|can|do|does) (?:i |we |you |they |patients )?(?:get |schedule |book |do |have )?{_ART}(?P<exam>.+?)(?: (?:be )?{_DONE})?"),
+    ("locations_for_exam", rf"where (?:to|can i) (?:get|schedule|book) {_ART}(?P<exam>.+)"),
+    ("locations_for_exam", rf"(?:which|what) (?:sites|locations|places|facilities) (?:can )?{_DO} {_ART}(?P<exam>.+)"),
+]
+_COMPILED = [(intent, re.compile(rf"^{pattern}$")) for intent, pattern in _TEMPLATES]
+
+# Politeness and filler around the question itself
+_LEADING_FILLER = re.compile(r"^(?:(?:hi|hey|hello|please|quick question|can you tell me|could you tell me|tell me|do you know)[, ]+)+")
+_TRAILING_FILLER = re.compile(r"(?:[, ]+(?:please|thanks|thank you))+$")
+_PUNCTUATION = re.compile(r"[?!.,;:]+")
+
+# Words that may trail an exam span without being part of the exam
+_EXAM_TRAILING = re.compile(r"(?: (?:scan|exam|study|visit|appointment|procedure|done|performed))+$")
+# "at" inside a site-less exam span means the question names a site
+# that this template did not expect
+_STRAY_SITE = re.compile(r"\bat\b")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and polite filler, collapse spaces."""
+    q = _PUNCTUATION.sub(" ", text.lower())
+    q = " ".join(q.split())
+    q = _LEADING_FILLER.sub("", q)
+    return _TRAILING_FILLER.sub("", q).strip()
+
+
+def _coverage(span_words: list, name: str) -> float:
+    """Share of `name`'s words that appear in the span."""
+    name_words = set(name.split())
+    if not name_words:
+        return 0.0
+    return len(name_words.intersection(span_words)) / len(name_words)
+
+
+def _exam_confidence(exam: str, ds):
+    scored = exam_match_scored(exam, ds)
+    if not scored:
+        return None
+    official, score = scored
+    return score * _coverage(normalize_text(exam).split(), normalize_text(official))
+
+
+def _site_confidence(site: str, ds):
+    scored = site_match_scored(site, ds)
+    if not scored:
+        return None
+    prefix, _, score = scored
+    # The span matched one of the prefix's searchable names (the prefix
+    # itself or an alias); judge coverage against the closest of them
+    words = normalize_site_text(site).split()
+    coverage = max(
+        _coverage(words, text)
+        for text, p in ds.site_matcher.searchable_to_prefix.items()
+        if p == prefix
+    )
+    return score * coverage
+
+
+def parse_scheduling_query(user_question: str, ds=None):
+    """
+    Try to parse `user_question` without the LLM.
+
+    Returns the same dict as interpret_scheduling_query plus
+    "confidence" (the lowest span confidence), e.g.
+        {"intent": "exam_duration", "exam": "ct head wo contrast",
+         "site": None, "confidence": 80.0}
+    or None when no template fits confidently (→ ask Gemini).
+    """
+    if not FAST_PATH_ENABLED or not isinstance(user_question, str):
+        return None
+
+    q = normalize_question(user_question)
+    if not q:
+        return None
+
+    ds = ds or get_dataset()
+
+    for intent, pattern in _COMPILED:
+        m = pattern.match(q)
+        if not m:
+            continue
+
+        groups = m.groupdict()
+        exam = groups.get("exam")
+        site = groups.get("site")
+        scores = []
+
+        if exam is not None:
+            exam = _EXAM_TRAILING.sub("", exam).strip()
+            if not exam or (site is None and _STRAY_SITE.search(exam)):
+                return None
+            confidence = _exam_confidence(exam, ds)
+            if confidence is None:
+                return None
+            scores.append(confidence)
+
+        if site is not None:
+            site = site.strip()
+            confidence = _site_confidence(site, ds)
+            if confidence is None:
+                return None
+            scores.append(confidence)
+
+        # The first matching template decides: if its spans are weak we
+        # do not try looser templates, Gemini gets the question instead.
+        if min(scores) < FAST_PATH_MIN_CONFIDENCE:
+            return None
+
+        return {"intent": intent, "exam": exam, "site": site, "confidence": min(scores)}
+
+    return None
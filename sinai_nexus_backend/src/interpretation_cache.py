@@ -0,0 +1,180 @@
+# -------------------------------------------------------------
+# interpretation_cache.py
+# -------------------------------------------------------------
+# Purpose:
+#   Persistent cache of Gemini interpretations so a question that
+#   was already asked (give or take case, punctuation and filler)
+#   does not pay for another LLM call.
+#
+#   - Stored in a local SQLite file (INTERPRETATION_CACHE_PATH,
+#     next to the scheduling snapshot cache by default). On fly that
+#     is the /data volume (fly.toml), so it survives restarts and
+#     scale-to-zero.
+#   - Keyed by the normalized question (see intent_rules.normalize_question).
+#   - Each entry holds the parsed {intent, exam, site} JSON and
+#     expires after INTERPRETATION_CACHE_TTL seconds.
+#   - Only usable parses are stored (one of the SCHEDULING_INTENTS the
+#     router handles); failures and made-up intents are retried on the
+#     next ask.
+#
+#   Inspect / flush it through /admin/interpretation-cache.
+# -------------------------------------------------------------
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from src.intent_rules import SCHEDULING_INTENTS
+
+INTERPRETATION_CACHE_PATH = os.getenv(
+    "INTERPRETATION_CACHE_PATH",
+    os.path.join(os.getenv("SCHEDULING_CACHE_DIR", "data/cache"), "interpretations.sqlite3"),
+)
+INTERPRETATION_CACHE_TTL = float(os.getenv("INTERPRETATION_CACHE_TTL", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interpretations (
+    key         TEXT PRIMARY KEY,
+    question    TEXT NOT NULL,
+    parsed      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    last_hit_at REAL
+)
+"""
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+class InterpretationCache:
+    def __init__(self, path: str = INTERPRETATION_CACHE_PATH, ttl: float = INTERPRETATION_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _connection(self):
+        # Opened lazily so importing the module never touches the disk;
+        # one connection shared by the worker threads under self._lock.
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        """Return the cached parse for `key`, or None (missing or expired)."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT parsed FROM interpretations WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE interpretations SET hits = hits + 1, last_hit_at = ? WHERE key = ?",
+                    (now, key),
+                )
+                conn.commit()
+                self.hits += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            # A broken cache must never break /agent-chat
+            print("interpretation cache get error:", e)
+            self.errors += 1
+            return None
+
+    def put(self, key: str, question: str, parsed: dict):
+        """Store a usable parse (one with a handled intent)."""
+        if not key or not isinstance(parsed, dict) or parsed.get("intent") not in SCHEDULING_INTENTS:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO interpretations "
+                    "(key, question, parsed, created_at, expires_at, hits, last_hit_at) "
+                    "VALUES (?, ?, ?, ?, ?, 0, NULL)",
+                    (key, question, json.dumps(parsed), now, now + self.ttl),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print("interpretation cache put error:", e)
+            self.errors += 1
+
+    def flush(self, expired_only: bool = False) -> int:
+        """Delete every entry (or only expired ones); return how many."""
+        with self._lock:
+            conn = self._connection()
+            if expired_only:
+                cur = conn.execute("DELETE FROM interpretations WHERE expires_at <= ?", (time.time(),))
+            else:
+                cur = conn.execute("DELETE FROM interpretations")
+            conn.commit()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            total, expired, stored_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(expires_at <= ?), 0), COALESCE(SUM(hits), 0) "
+                "FROM interpretations",
+                (now,),
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "ttl_seconds": self.ttl,
+            "entries": total,
+            "expired": expired,
+            "hits_all_time": stored_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "errors": self.errors,
+        }
+
+    def entries(self, limit: int = 50) -> list:
+        """Most recently written entries, newest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT key, question, parsed, created_at, expires_at, hits, last_hit_at "
+                "FROM interpretations ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "key": key,
+                "question": question,
+                "parsed": json.loads(parsed),
+                "created_at": _iso(created_at),
+                "expires_at": _iso(expires_at),
+                "hits": hits,
+                "last_hit_at": _iso(last_hit_at),
+            }
+            for key, question, parsed, created_at, expires_at, hits, last_hit_at in rows
+        ]
+
+
+interpretation_cache = InterpretationCache()
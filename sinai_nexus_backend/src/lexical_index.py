@@ -0,0 +1,187 @@
+# -------------------------------------------------------------
+# lexical_index.py
+# -------------------------------------------------------------
+# Purpose:
+#   BM25 inverted index over documents.content for /rag-chat.
+#
+#   Scheduling questions are full of exact codes and room names
+#   ("HESS CT ROOM 6", "1176 5TH AVE") that MiniLM embeddings blur;
+#   a lexical ranking finds those chunks by the literal terms. The
+#   two rankings are combined with reciprocal rank fusion (RRF):
+#       fused(row) = Σ over rankings  1 / (RRF_K + rank)
+#   which needs no score calibration between BM25 and cosine.
+#
+#   The index is kept next to the vector index (vector_index.py):
+#   rebuilt on its full loads, updated on /upload and /delete-file.
+#
+#   is_exact_term_query() spots questions the lexical side can answer
+#   on its own (a code-like term and a chunk containing every query
+#   term), so /rag-chat can skip the embedding call for them.
+# -------------------------------------------------------------
+
+import os
+import re
+import math
+import threading
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Longer questions are prose; leave them to the embeddings
+LEXICAL_ONLY_MAX_TERMS = int(os.getenv("LEXICAL_ONLY_MAX_TERMS", "6"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me of on or
+the this to what when where which who why with you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric terms, stopwords dropped (digits kept: room 6)."""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def row_key(row: dict):
+    # Same identity the answer cache uses: the row id, else the chunk itself
+    return row.get("id") or (row.get("file_path"), row.get("content"))
+
+
+def _note_inactive(row: dict, today: str) -> bool:
+    if row.get("priority") != 1:
+        return False
+    start, end = row.get("start_date"), row.get("end_date")
+    return bool((start and start > today) or (end and end < today))
+
+
+class BM25Index:
+    def __init__(self, rows: list = ()):
+        self._postings = {}     # term → {key: term frequency}
+        self._lengths = {}      # key → number of terms
+        self._rows = {}         # key → row (without the embedding)
+        self._order = {}        # key → insertion number (stable ties)
+        self._by_path = {}      # file_path → set of keys
+        self._total_length = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.add_rows(rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def terms(self) -> int:
+        return len(self._postings)
+
+    def add_rows(self, rows: list):
+        with self._lock:
+            for row in rows:
+                key = row_key(row)
+                if key in self._rows:
+                    self._remove_key(key)
+                terms = tokenize(row.get("content"))
+                self._rows[key] = {k: v for k, v in row.items() if k != "embedding"}
+                self._lengths[key] = len(terms)
+                self._order[key] = self._next
+                self._next += 1
+                self._total_length += len(terms)
+                self._by_path.setdefault(row.get("file_path"), set()).add(key)
+                for term in terms:
+                    postings = self._postings.setdefault(term, {})
+                    postings[key] = postings.get(key, 0) + 1
+
+    def _remove_key(self, key):
+        """Drop one chunk (caller holds the lock)."""
+        row = self._rows.pop(key)
+        self._total_length -= self._lengths.pop(key)
+        del self._order[key]
+        keys = self._by_path.get(row.get("file_path"))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_path[row.get("file_path")]
+        for term in set(tokenize(row.get("content"))):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def remove_files(self, paths: set):
+        with self._lock:
+            for path in paths:
+                for key in list(self._by_path.get(path, ())):
+                    self._remove_key(key)
+
+    def search(self, query: str, k: int, today: str) -> list:
+        """
+        Top-k rows by BM25 (inactive notes skipped), best first,
+        each with its "bm25" score and the "terms_matched" count.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            n = len(self._rows)
+            if not terms or n == 0:
+                return []
+            avg_length = self._total_length / n or 1.0
+
+            scores, matched = {}, {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[key] / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[key] = matched.get(key, 0) + 1
+
+            ranked = sorted(scores, key=lambda key: (-scores[key], self._order[key]))
+            hits = []
+            for key in ranked:
+                row = self._rows[key]
+                if _note_inactive(row, today):
+                    continue
+                hits.append(dict(row, bm25=scores[key], terms_matched=matched[key]))
+                if len(hits) == k:
+                    break
+            return hits
+
+
+def may_be_exact_term_query(query: str) -> bool:
+    """
+    The part of is_exact_term_query that needs no search: a short query
+    with at least one code-like term (a number, e.g. a room or street
+    number). When False the query will need its embedding.
+    """
+    terms = set(tokenize(query))
+    if not terms or len(terms) > LEXICAL_ONLY_MAX_TERMS:
+        return False
+    return any(any(ch.isdigit() for ch in t) for t in terms)
+
+
+def is_exact_term_query(query: str, hits: list) -> bool:
+    """
+    True when the lexical ranking alone is trustworthy: a query that
+    may_be_exact_term_query() whose best BM25 hit contains every term.
+    """
+    if not hits or not may_be_exact_term_query(query):
+        return False
+    return hits[0]["terms_matched"] == len(set(tokenize(query)))
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> list:
+    """
+    Fuse ranked row lists into one: [(fused score, row)], best first.
+    Rows are matched across lists by row_key(); fields from every list
+    are merged (e.g. "distance" from the vector side, "bm25" from here).
+    """
+    fused, rows, first_seen = {}, {}, {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            key = row_key(row)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            rows[key] = {**row, **rows[key]} if key in rows else row
+            first_seen.setdefault(key, len(first_seen))
+    order = sorted(fused, key=lambda key: (-fused[key], first_seen[key]))
+    return [(fused[key], rows[key]) for key in order]
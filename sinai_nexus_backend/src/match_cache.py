@@ -0,0 +1,120 @@
+# -------------------------------------------------------------
+# match_cache.py
+# -------------------------------------------------------------
+# Purpose:
+#   Remember resolved exam/site matches so the phrases schedulers
+#   type over and over ("ct head wo", "hess", "union square") cost
+#   a dictionary hit instead of normalization + fuzzy scoring.
+#
+#   - Bounded LRU: at most MATCH_CACHE_SIZE entries, least recently
+#     used ones are evicted first.
+#   - TTL: entries expire after MATCH_CACHE_TTL seconds.
+#   - Versioned: entries belong to one dataset version. The first
+#     lookup for a new version (after a reload) drops everything
+#     cached for the old one.
+#   - Hit/miss/eviction counters are reported by stats() (/healthz).
+# -------------------------------------------------------------
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "4096"))
+MATCH_CACHE_TTL = float(os.getenv("MATCH_CACHE_TTL", "3600"))
+
+
+class MatchCache:
+    def __init__(self, maxsize: int = MATCH_CACHE_SIZE, ttl: float = MATCH_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key → (expires_at, value)
+        self._version = None
+        self._retired = set()           # versions we have moved past
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _switch_version(self, version) -> bool:
+        """
+        Make `version` current (caller holds the lock). Returns False for
+        a version we already moved past: a request still pinned to the old
+        snapshot during a reload. Those bypass the cache.
+        """
+        if version == self._version:
+            return True
+        if version in self._retired:
+            return False
+
+        if self._version is not None:
+            self._retired.add(self._version)
+            self.invalidations += 1
+        self._version = version
+        self._entries.clear()
+        return True
+
+    def get_or_compute(self, version, key, compute):
+        """
+        Return the cached value for `key` under dataset `version`, or call
+        compute() and cache its result (None results are cached too).
+        """
+        if self.maxsize <= 0:
+            return compute()
+
+        now = time.monotonic()
+        with self._lock:
+            current = self._switch_version(version)
+            if current:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    expires_at, value = entry
+                    if expires_at > now:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return value
+                    del self._entries[key]
+                    self.expirations += 1
+            self.misses += 1
+
+        # Scoring runs outside the lock; two threads missing on the same
+        # key at once both compute it, which is harmless.
+        value = compute()
+        if not current:
+            return value
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# One cache for exam and site lookups; keys carry the kind
+match_cache = MatchCache()
@@ -0,0 +1,81 @@
+# -------------------------------------------------------------
+# metrics.py
+# -------------------------------------------------------------
+# Purpose:
+#   Tiny in-process metrics registry for the backend:
+#     - counters  → how often something happened
+#                   (e.g. "scheduling.parse_path.rules")
+#     - timings   → latency samples with count / mean / p50 / p95 / p99
+#                   over the most recent METRICS_WINDOW samples
+#
+#   Everything lives in memory and resets on restart; GET /metrics
+#   returns snapshot() as JSON.
+# -------------------------------------------------------------
+
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+
+
+class Metrics:
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self._counters = {}
+        self._timings = {}   # name → {"count", "total", "samples": deque}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = {"count": 0, "total": 0.0, "samples": deque(maxlen=self.window)}
+                self._timings[name] = timing
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["samples"].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the body of a `with` block: with metrics.timer("x"): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: (t["count"], t["total"], sorted(t["samples"]))
+                for name, t in self._timings.items()
+            }
+
+        def pct(samples, q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+
+        return {
+            "counters": counters,
+            "timings_ms": {
+                name: {
+                    "count": count,
+                    "mean": round(total / count * 1000, 2),
+                    "p50": pct(samples, 0.50),
+                    "p95": pct(samples, 0.95),
+                    "p99": pct(samples, 0.99),
+                    "max": round(samples[-1] * 1000, 2),
+                }
+                for name, (count, total, samples) in timings.items()
+            },
+        }
+
+
+metrics = Metrics()
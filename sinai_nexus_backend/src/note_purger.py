@@ -0,0 +1,118 @@
+# -------------------------------------------------------------
+# note_purger.py
+# -------------------------------------------------------------
+# Purpose:
+#   Delete expired notes (end_date < today, New York time) from the
+#   Supabase `documents` table on a schedule, instead of issuing a
+#   DELETE at the start of every /rag-chat and /agent-chat request.
+#
+#   Two kinds of notes expire:
+#     - Document Q&A notes: priority 1 JSON files
+#     - scheduling notes:   file_path contains "Scheduling_Notes"
+#
+#   Request handlers only read; their date-range filters
+#   (add_effective_range_filters / is_note_active / the vector index)
+#   already hide a note from the day it expires, so between runs an
+#   expired row just waits to be deleted.
+#
+#   Runs once at startup and then every NOTE_PURGE_INTERVAL seconds
+#   on a daemon thread (0 = startup only). Metrics: note_purge.runs,
+#   .deleted and .errors counters plus the note_purge.run timing;
+#   status() is reported by /healthz.
+# -------------------------------------------------------------
+
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+from src.metrics import metrics
+from src.query_router import today_ny_str
+
+NOTE_PURGE_INTERVAL = float(os.getenv("NOTE_PURGE_INTERVAL", "3600"))
+
+
+def _expired_rag_notes_query(supabase, today: str):
+    return (
+        supabase.table("documents")
+        .delete()
+        .eq("priority", 1)
+        .ilike("file_path", "%.json")   # notes are JSON
+        .lt("end_date", today)          # expired
+    )
+
+
+def _expired_scheduling_notes_query(supabase, today: str):
+    return (
+        supabase.table("documents")
+        .delete()
+        .ilike("file_path", "%Scheduling_Notes%")
+        .lt("end_date", today)
+    )
+
+
+class NotePurger:
+    def __init__(self, interval: float = NOTE_PURGE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()   # one purge at a time
+        self._thread = None
+
+        self.runs = 0
+        self.last_run_at = None
+        self.last_deleted = None
+        self.last_error = None
+
+    def run_once(self, supabase) -> int:
+        """Delete expired notes now; return how many rows were deleted."""
+        today = today_ny_str()
+        deleted = 0
+        errors = []
+
+        with self._lock, metrics.timer("note_purge.run"):
+            for build in (_expired_rag_notes_query, _expired_scheduling_notes_query):
+                try:
+                    res = build(supabase, today).execute()
+                    deleted += len(res.data or [])
+                except Exception as e:
+                    print("purge expired notes error:", e)
+                    errors.append(str(e))
+
+            self.runs += 1
+            self.last_run_at = datetime.now(timezone.utc).isoformat()
+            self.last_deleted = deleted
+            self.last_error = "; ".join(errors) or None
+
+        metrics.incr("note_purge.runs")
+        metrics.incr("note_purge.deleted", deleted)
+        if errors:
+            metrics.incr("note_purge.errors", len(errors))
+        if deleted:
+            print(f"🧹 Purged {deleted} expired notes")
+        return deleted
+
+    def start(self, supabase):
+        """Purge now, then every `interval` seconds, on a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def _loop():
+            while True:
+                self.run_once(supabase)
+                if self.interval <= 0:
+                    return
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(target=_loop, name="note-purger", daemon=True)
+        self._thread.start()
+
+    def status(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_deleted": self.last_deleted,
+            "last_error": self.last_error,
+        }
+
+
+note_purger = NotePurger()
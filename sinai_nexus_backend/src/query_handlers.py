@@ -3,9 +3,18 @@
 # -------------------------------------------------------------
 # Purpose:
 #   Implement the core logic for each scheduling question type.
+#
+#   Every handler takes an optional `ds` (dataset snapshot). The
+#   router passes the one it pinned for the request so the matchers
+#   and the table lookups always agree on the dataset version, even
+#   while a hot reload swaps in a new snapshot.
+#
+#   The table lookups go through ds.index (see scheduling_index.py),
+#   which is built once per snapshot, so they cost a dictionary hit
+#   rather than a scan of the whole export.
 # -------------------------------------------------------------
 
-from src.data_loader import df, ROOM_PREFIX_TO_LOCATION, USER_UPDATES
+from src.data_loader import get_dataset, USER_UPDATES
 from src.fuzzy_matchers import best_exam_match, best_site_match
 
 # -------------------------------------------------------------
@@ -32,10 +41,12 @@ from src.fuzzy_matchers import best_exam_match, best_site_match
 #   False → no match found (or not enough info provided)
 #   Also returns the best-matched official exam and site names.
 # -------------------------------------------------------------
-def exam_at_site(exam_query, site_query):
+def exam_at_site(exam_query, site_query, ds=None):
+    ds = ds or get_dataset()
+
     # Try to find likely official names for the exam and site
-    exam = best_exam_match(exam_query)
-    site_match = best_site_match(site_query)
+    exam = best_exam_match(exam_query, ds)
+    site_match = best_site_match(site_query, ds)
     if not site_match:
         return (False, exam, None)
 
@@ -55,11 +66,9 @@ def exam_at_site(exam_query, site_query):
             print(f"⚠️ Note: {exam} at {site} temporarily disabled ({entry['reason']})")
             return (False, exam, site)
 
-    # Filter the table to rows where BOTH the exam and site are among our best guesses
-    subset = df[(df["EAP Name"]==exam) & (df["DEP Name"].isin(deps))]
-
-    # If there is at least one row, then yes — that exam is offered at that site
-    found = not subset.empty
+    # Look for any row where BOTH the exam and one of the site's departments
+    # appear together. If there is one, then yes — that exam is offered there
+    found = ds.index.exam_offered_at(exam, deps)
 
     return (found, exam, site)
 
@@ -83,18 +92,16 @@ def exam_at_site(exam_query, site_query):
 #   Empty list → exam not found (or couldn't guess it confidently).
 #.  Also 
 # -------------------------------------------------------------
-def locations_for_exam(exam_query):
-    exam = best_exam_match(exam_query)
+def locations_for_exam(exam_query, ds=None):
+    ds = ds or get_dataset()
+    exam = best_exam_match(exam_query, ds)
     # print("DEBUG – exam matched for locations_for_exam:", exam)
 
     if not exam:
         return ([], None)
 
-    # All rows that match any of the most likely exam name
-    matches = df[df["EAP Name"] == exam]
-
-    # Get distinct site names as a simple Python list
-    sites = matches["DEP Name"].drop_duplicates().tolist()
+    # Distinct site names for the exam, in table order
+    sites = ds.index.departments_for_exam(exam)
 
     # Return the list of sites and the official exam name
     return (sites, exam)
@@ -117,27 +124,27 @@ def locations_for_exam(exam_query):
 #   A list of exam names (strings).
 #   Empty list → site not found (or couldn’t guess it confidently).
 
-def exams_at_site(site_query: str):
+def exams_at_site(site_query: str, ds=None):
     """
     Return all unique exam names available at a given site and the official site name.
     Uses the fuzzy site matching function to allow
     flexible wording (e.g. '1176 fifth ave' → '1176 5TH AVE RAD CT').
     """
-    site_match = best_site_match(site_query)
+    ds = ds or get_dataset()
+    site_match = best_site_match(site_query, ds)
     if not site_match:
         return ([], None)
 
     site, deps = site_match     # best_site_match now returns (prefix (AKA location name), [dep1, dep2, ...])
 
-    subset = df[df["DEP Name"].isin(deps)]
-    exams = subset["EAP Name"].drop_duplicates().tolist()
+    exams = ds.index.exams_for_departments(deps)
 
     return (exams, site)
 
 # -------------------------------------------------------------
 # Helper for intent 4: exam_duration
 # -------------------------------------------------------------
-def exam_duration(exam_query: str):
+def exam_duration(exam_query: str, ds=None):
     """
     Return the visit length (in minutes) for a given exam.
 
@@ -147,17 +154,13 @@ def exam_duration(exam_query: str):
 
     Uses fuzzy matching so partial or imprecise names still work.
     """
-    exam = best_exam_match(exam_query)
+    ds = ds or get_dataset()
+    exam = best_exam_match(exam_query, ds)
     if not exam:
         return ([], None)
 
     # Get all unique durations (in case of duplicates)
-    durations = (
-        df[df["EAP Name"]==exam]["Visit Type Length"]
-        .dropna()
-        .unique()
-        .tolist()
-    )
+    durations = ds.index.durations_for_exam(exam)
 
     if not durations:
         return None
@@ -168,7 +171,7 @@ def exam_duration(exam_query: str):
 # -------------------------------------------------------------
 # Helper for intent 5: rooms_for_exam_at_site
 # -------------------------------------------------------------
-def rooms_for_exam_at_site(exam_query: str, site_query: str):
+def rooms_for_exam_at_site(exam_query: str, site_query: str, ds=None):
     """
     Return all room names at a given site that perform a specific exam, as well as the official exam and site names.
 
@@ -184,38 +187,24 @@ def rooms_for_exam_at_site(exam_query: str, site_query: str):
     """
 
     # Step 1. Use fuzzy matching to identify the official exam name and site
-    exam = best_exam_match(exam_query)
-    site_match = best_site_match(site_query)
+    ds = ds or get_dataset()
+    exam = best_exam_match(exam_query, ds)
+    site_match = best_site_match(site_query, ds)
     if not exam or not site_match:
         return ([], exam, None)
 
     site, _ = site_match  # site refers to location prefix/name (e.g., "1176 5TH AVE")
 
-    matched_prefixes = [
-    room_prefix
-    for room_prefix, location in ROOM_PREFIX_TO_LOCATION.items()
-    if location == site
-    ]
+    # Steps 2 + 3 are precomputed per (exam, location) in the index:
+    # the exam's rooms whose prefix maps to this site, sorted.
+    rooms_at_site = ds.index.rooms_for_exam_at_location(exam, site)
 
-    if not matched_prefixes:
-        return ([], exam, site)
-
-    # Step 2. Get all room names associated with the given exam
-    subset = df[df["EAP Name"]==exam]
-    all_rooms = subset["Room Name"].dropna().unique().tolist()
-
-    # Step 3. Filter those rooms whose prefix matches the site's prefix
-    rooms_at_site = [
-        room for room in all_rooms
-        if any(room.startswith(prefix) for prefix in matched_prefixes)
-    ]
-
-    return (sorted(rooms_at_site), exam, site)
+    return (rooms_at_site, exam, site)
 
 # -------------------------------------------------------------
 # Helper for intent 6: rooms_for_exam
 # -------------------------------------------------------------
-def rooms_for_exam(exam_query: str):
+def rooms_for_exam(exam_query: str, ds=None):
     """
     Purpose:
         Return ALL rooms (across all sites) that perform a given exam and the official exam name.
@@ -231,14 +220,13 @@ def rooms_for_exam(exam_query: str):
         - Filter the dataframe to those exam(s)
         - Collect and return the unique room names
     """
-    exam = best_exam_match(exam_query)
+    ds = ds or get_dataset()
+    exam = best_exam_match(exam_query, ds)
     
     if not exam:
         return ([], exam)
 
-    subset = df[df["EAP Name"] == exam]
-
-    # Drop duplicates, ignore missing values
-    rooms = subset["Room Name"].dropna().unique().tolist()
+    # Unique room names (missing values ignored), sorted
+    rooms = ds.index.rooms_for_exam(exam)
 
-    return (sorted(rooms), exam)
\ No newline at end of file
+    return (rooms, exam)
\ No newline at end of file
@@ -15,25 +15,9 @@ load_dotenv()
 google_api_key = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=google_api_key)
 
-def interpret_scheduling_query(user_question: str):
-    """
-    Purpose:
-        Convert a natural language question (e.g. "Where is CT Head done?")
-        into a structured JSON object describing intent and key entities.
-
-    Output example:
-        {
-          "intent": "exam_at_site",
-          "exam": "CT HEAD WO IV CONTRAST",
-          "site": "1176 5TH AVE RAD CT"
-        }
-
-    Possible intents:
-        • exam_at_site        → asks if an exam is done at a given site
-        • locations_for_exam  → asks which sites perform an exam
-        • exams_at_site       → asks which exams a site performs
-    """
-    prompt = f"""
+def _build_prompt(user_question: str) -> str:
+    """The intent-extraction prompt shared by the sync and async calls."""
+    return f"""
     You are a medical scheduling assistant. The user asked:
 
     "{user_question}"
@@ -58,15 +42,47 @@ def interpret_scheduling_query(user_question: str):
     }}
     """
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
-    text = response.text or ""
 
+def _parse_response_text(text: str):
+    """Pull the JSON object out of Gemini's reply (None fields if unusable)."""
     # Extract JSON safely
-    match = re.search(r'\{.*\}', text, re.S)
+    match = re.search(r'\{.*\}', text or "", re.S)
     if not match:
         return {"intent": None, "exam": None, "site": None}
     try:
         return json.loads(match.group(0))
     except json.JSONDecodeError:
-        return {"intent": None, "exam": None, "site": None}
\ No newline at end of file
+        return {"intent": None, "exam": None, "site": None}
+
+
+def interpret_scheduling_query(user_question: str):
+    """
+    Purpose:
+        Convert a natural language question (e.g. "Where is CT Head done?")
+        into a structured JSON object describing intent and key entities.
+
+    Output example:
+        {
+          "intent": "exam_at_site",
+          "exam": "CT HEAD WO IV CONTRAST",
+          "site": "1176 5TH AVE RAD CT"
+        }
+
+    Possible intents:
+        • exam_at_site        → asks if an exam is done at a given site
+        • locations_for_exam  → asks which sites perform an exam
+        • exams_at_site       → asks which exams a site performs
+    """
+    model = genai.GenerativeModel("gemini-2.5-flash")
+    response = model.generate_content(_build_prompt(user_question))
+    return _parse_response_text(response.text)
+
+
+async def interpret_scheduling_query_async(user_question: str):
+    """
+    Same as interpret_scheduling_query, but awaits Gemini instead of
+    blocking a worker thread for the whole round trip.
+    """
+    model = genai.GenerativeModel("gemini-2.5-flash")
+    response = await model.generate_content_async(_build_prompt(user_question))
+    return _parse_response_text(response.text)
\ No newline at end of file
@@ -6,14 +6,19 @@
 #   query handler function.
 # -------------------------------------------------------------
 
-from typing import Optional
+import time
+import asyncio
+from typing import NamedTuple, Optional
 from difflib import get_close_matches
 
 # ✅ ADDED
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from src.query_interpreter import interpret_scheduling_query
+from src.query_interpreter import interpret_scheduling_query, interpret_scheduling_query_async
+from src.intent_rules import parse_scheduling_query, normalize_question
+from src.interpretation_cache import interpretation_cache
+from src.metrics import metrics
 from src.query_handlers import (
     exam_at_site,
     locations_for_exam,
@@ -24,6 +29,7 @@ from src.query_handlers import (
 )
 
 from src.update_helpers import get_location_options_from_db
+from src.data_loader import get_dataset
 
 
 def detect_location_from_question(user_text: str, supabase):
@@ -75,31 +81,42 @@ def add_effective_range_filters(q, today: str):
     return q
 
 
-def purge_expired_notes(supabase, today: str):
-    """
-    Auto-delete expired notes (end_date < today) from Supabase.
-    NOTE: This runs opportunistically when notes are fetched.
-    """
-    if not supabase:
-        return
-
-    try:
-        (
-            supabase
-            .table("documents")
-            .delete()
-            .ilike("file_path", "%Scheduling_Notes%")
-            .lt("end_date", today)
-            .execute()
-        )
-    except Exception as e:
-        print("purge_expired_notes error:", e)
-
-
 # -------------------------------
 # Location Notes (Supabase-only)
 # -------------------------------
 
+def _location_notes_query(supabase, location: str, today: str):
+    q = (
+        supabase
+        .table("documents")
+        .select("content,file_path,location,start_date,end_date")  # ✅ ADDED fields
+        .eq("location", location)
+        .ilike("file_path", "%Scheduling_Notes%")
+    )
+
+    # ✅ ADDED: only active notes should show up
+    return add_effective_range_filters(q, today)
+
+
+def _unique_note_texts(data):
+    # De-dupe notes by file_path (since multiple chunks could exist)
+    seen_paths = set()
+    notes = []
+
+    for r in data:
+        fp = r.get("file_path")
+        if fp and fp in seen_paths:
+            continue
+        if fp:
+            seen_paths.add(fp)
+
+        txt = (r.get("content") or "").strip()
+        if txt:
+            notes.append(txt)
+
+    return notes
+
+
 def get_location_notes_from_db(supabase, location: str):
     """
     Pull location notes from Supabase documents table.
@@ -111,53 +128,33 @@ def get_location_notes_from_db(supabase, location: str):
         return []
 
     try:
+        # Expired notes are deleted by the scheduled purge (note_purger.py);
+        # the date-range filter already leaves them out
         today = today_ny_str()
+        res = _location_notes_query(supabase, location, today).execute()
+        return _unique_note_texts(res.data or [])
 
-        # ✅ ADDED: auto-delete expired notes first
-        purge_expired_notes(supabase, today)
-
-        q = (
-            supabase
-            .table("documents")
-            .select("content,file_path,location,start_date,end_date")  # ✅ ADDED fields
-            .eq("location", location)
-            .ilike("file_path", "%Scheduling_Notes%")
-        )
-
-        # ✅ ADDED: only active notes should show up
-        q = add_effective_range_filters(q, today)
-
-        res = q.execute()
-        data = res.data or []
-
-        # De-dupe notes by file_path (since multiple chunks could exist)
-        seen_paths = set()
-        notes = []
+    except Exception as e:
+        print("get_location_notes_from_db error:", e)
+        return []
 
-        for r in data:
-            fp = r.get("file_path")
-            if fp and fp in seen_paths:
-                continue
-            if fp:
-                seen_paths.add(fp)
 
-            txt = (r.get("content") or "").strip()
-            if txt:
-                notes.append(txt)
+async def get_location_notes_from_db_async(supabase, location: str):
+    """get_location_notes_from_db for the async Supabase client."""
+    if not supabase or not location:
+        return []
 
-        return notes
+    try:
+        today = today_ny_str()
+        res = await _location_notes_query(supabase, location, today).execute()
+        return _unique_note_texts(res.data or [])
 
     except Exception as e:
         print("get_location_notes_from_db error:", e)
         return []
 
 
-def format_location_notes(location: str, supabase=None):
-    """
-    Format location-specific notes for display, if any exist.
-    """
-    notes = get_location_notes_from_db(supabase, location)
-
+def _format_notes_block(notes):
     # De-dupe by content (preserve order)
     deduped = []
     seen = set()
@@ -177,6 +174,18 @@ def format_location_notes(location: str, supabase=None):
     return formatted + "\n"
 
 
+def format_location_notes(location: str, supabase=None):
+    """
+    Format location-specific notes for display, if any exist.
+    """
+    return _format_notes_block(get_location_notes_from_db(supabase, location))
+
+
+async def format_location_notes_async(location: str, supabase=None):
+    """format_location_notes for the async Supabase client."""
+    return _format_notes_block(await get_location_notes_from_db_async(supabase, location))
+
+
 # Helper functions to return official site and exam names
 def format_exam_header(exam, content):
     return (
@@ -186,8 +195,11 @@ def format_exam_header(exam, content):
     )
 
 
-def format_site_exam_header(site, exam, content, supabase=None):
-    notes_block = format_location_notes(site, supabase)
+# notes_block: pre-fetched location notes (the async path passes them in);
+# when None the notes are fetched here with the sync client.
+def format_site_exam_header(site, exam, content, supabase=None, notes_block=None):
+    if notes_block is None:
+        notes_block = format_location_notes(site, supabase)
 
     return (
         f"Location name: {site}\n"
@@ -198,8 +210,9 @@ def format_site_exam_header(site, exam, content, supabase=None):
     )
 
 
-def format_site_header(site, content, supabase=None):
-    notes_block = format_location_notes(site, supabase)
+def format_site_header(site, content, supabase=None, notes_block=None):
+    if notes_block is None:
+        notes_block = format_location_notes(site, supabase)
 
     return (
         f"Location name: {site}\n\n"
@@ -209,18 +222,95 @@ def format_site_header(site, content, supabase=None):
     )
 
 
-def answer_scheduling_query(user_input: str, supabase=None):
-    parsed = interpret_scheduling_query(user_input)
+def _interpret_without_llm(user_input: str, ds=None):
+    """
+    Deterministic templates (intent_rules.py), then the persistent
+    interpretation cache. Returns (parsed, parse_path, cache_key);
+    parsed is None when Gemini has to be asked.
+    """
+    parsed = parse_scheduling_query(user_input, ds)
+    if parsed is not None:
+        return parsed, "rules", None
+
+    key = normalize_question(user_input or "")
+    parsed = interpretation_cache.get(key) if key else None
+    if parsed is not None:
+        return parsed, "cache", key
+    return None, None, key
+
+
+def _record_parse(parse_path: str, started: float):
+    metrics.incr(f"scheduling.parse_path.{parse_path}")
+    metrics.observe(f"scheduling.parse.{parse_path}", time.perf_counter() - started)
+
+
+def interpret_with_fast_path(user_input: str, ds=None):
+    """
+    Parse the question with the deterministic templates first
+    (intent_rules.py), then the persistent interpretation cache, and
+    only call Gemini when neither has an answer.
+
+    Returns (parsed, parse_path) where parse_path is "rules", "cache"
+    or "gemini". Every path is counted and timed in metrics.
+    """
+    started = time.perf_counter()
+    parsed, parse_path, key = _interpret_without_llm(user_input, ds)
+    if parsed is None:
+        parsed = interpret_scheduling_query(user_input)
+        parse_path = "gemini"
+        interpretation_cache.put(key, user_input, parsed)
+
+    _record_parse(parse_path, started)
+    return parsed, parse_path
+
+
+async def interpret_with_fast_path_async(user_input: str, ds=None):
+    """
+    interpret_with_fast_path, awaiting Gemini when it is needed. The
+    SQLite interpretation cache (disk I/O under a lock shared with the
+    admin endpoints) is read and written on a worker thread, never on
+    the event loop.
+    """
+    started = time.perf_counter()
+    parsed, parse_path, key = await asyncio.to_thread(_interpret_without_llm, user_input, ds)
+    if parsed is None:
+        parsed = await interpret_scheduling_query_async(user_input)
+        parse_path = "gemini"
+        await asyncio.to_thread(interpretation_cache.put, key, user_input, parsed)
+
+    _record_parse(parse_path, started)
+    return parsed, parse_path
+
+
+class SiteReply(NamedTuple):
+    """
+    An answer about a specific location. Its header includes that
+    location's notes, which come from Supabase, so the caller fetches
+    them (sync or async) and then calls render().
+    """
+    site: str
+    exam: Optional[str]
+    content: str
+
+    def render(self, notes_block: str) -> str:
+        if self.exam:
+            return format_site_exam_header(self.site, self.exam, self.content, notes_block=notes_block)
+        return format_site_header(self.site, self.content, notes_block=notes_block)
+
+
+def resolve_scheduling_answer(parsed: dict, ds):
+    """
+    Run the handler for a parsed question against snapshot `ds`.
+    Returns the finished reply (str), or a SiteReply that still needs
+    its location notes. No I/O here, so the sync and async entry
+    points share it.
+    """
     intent = parsed.get("intent")
     exam = parsed.get("exam")
     site = parsed.get("site")
 
-    print("\n--- Gemini interpretation ---")
-    print(parsed)
-    print("------------------------------\n")
-
     if intent == "exam_at_site" and exam and site:
-        found, official_exam, official_site = exam_at_site(exam, site)
+        found, official_exam, official_site = exam_at_site(exam, site, ds)
 
         if not official_exam:
             return "Exam name not recognized."
@@ -233,10 +323,10 @@ def answer_scheduling_query(user_input: str, supabase=None):
             else "No, this exam is not performed at this site."
         )
 
-        return format_site_exam_header(official_site, official_exam, content, supabase)
+        return SiteReply(official_site, official_exam, content)
 
     elif intent == "locations_for_exam" and exam:
-        locs, official_exam = locations_for_exam(exam)
+        locs, official_exam = locations_for_exam(exam, ds)
 
         if not official_exam:
             return "Exam name not recognized. Please check the spelling or try a more complete name."
@@ -247,7 +337,7 @@ def answer_scheduling_query(user_input: str, supabase=None):
         return format_exam_header(official_exam, content)
 
     elif intent == "exams_at_site" and site:
-        exams, official_site = exams_at_site(site)
+        exams, official_site = exams_at_site(site, ds)
 
         if not official_site:
             return "Site name not recognized."
@@ -255,10 +345,10 @@ def answer_scheduling_query(user_input: str, supabase=None):
             return f"No exams found for the site: {official_site}."
 
         content = "Exams offered:\n" + "\n".join(exams)
-        return format_site_header(official_site, content, supabase)
+        return SiteReply(official_site, None, content)
 
     elif intent == "exam_duration" and exam:
-        duration, official_exam = exam_duration(exam)
+        duration, official_exam = exam_duration(exam, ds)
 
         if not official_exam:
             return "Exam name not recognized."
@@ -269,7 +359,7 @@ def answer_scheduling_query(user_input: str, supabase=None):
         return format_exam_header(official_exam, content)
 
     elif intent == "rooms_for_exam_at_site" and exam and site:
-        rooms, official_exam, official_site = rooms_for_exam_at_site(exam, site)
+        rooms, official_exam, official_site = rooms_for_exam_at_site(exam, site, ds)
 
         if not official_exam:
             return "Exam name not recognized."
@@ -279,10 +369,10 @@ def answer_scheduling_query(user_input: str, supabase=None):
             return f"No rooms found performing {official_exam} at {official_site}."
 
         content = "Rooms:\n" + "\n".join(rooms)
-        return format_site_exam_header(official_site, official_exam, content, supabase)
+        return SiteReply(official_site, official_exam, content)
 
     elif intent == "rooms_for_exam" and exam:
-        rooms, official_exam = rooms_for_exam(exam)
+        rooms, official_exam = rooms_for_exam(exam, ds)
 
         if not official_exam:
             return "Exam name not recognized."
@@ -293,4 +383,41 @@ def answer_scheduling_query(user_input: str, supabase=None):
         return format_exam_header(official_exam, content)
 
     else:
-        return "Sorry, I couldn’t understand that scheduling question."
\ No newline at end of file
+        return "Sorry, I couldn’t understand that scheduling question."
+
+
+def _log_interpretation(parsed: dict, parse_path: str):
+    print(f"\n--- Interpretation ({parse_path}) ---")
+    print(parsed)
+    print("------------------------------\n")
+
+
+def answer_scheduling_query(user_input: str, supabase=None):
+    # Pin one dataset snapshot for the whole request (see data_loader)
+    ds = get_dataset()
+
+    parsed, parse_path = interpret_with_fast_path(user_input, ds)
+    _log_interpretation(parsed, parse_path)
+
+    reply = resolve_scheduling_answer(parsed, ds)
+    if isinstance(reply, SiteReply):
+        return reply.render(format_location_notes(reply.site, supabase))
+    return reply
+
+
+async def answer_scheduling_query_async(user_input: str, supabase=None):
+    """
+    answer_scheduling_query for async callers (/agent-chat): the Gemini
+    call and the notes lookups are awaited, so one worker can keep many
+    questions in flight. `supabase` is the async client (acreate_client).
+    Matching and handlers are CPU-only and run inline.
+    """
+    ds = get_dataset()
+
+    parsed, parse_path = await interpret_with_fast_path_async(user_input, ds)
+    _log_interpretation(parsed, parse_path)
+
+    reply = resolve_scheduling_answer(parsed, ds)
+    if isinstance(reply, SiteReply):
+        return reply.render(await format_location_notes_async(reply.site, supabase))
+    return reply
@@ -0,0 +1,124 @@
+# -------------------------------------------------------------
+# scheduling_index.py
+# -------------------------------------------------------------
+# Purpose:
+#   Precompute the lookups behind the six scheduling intents so a
+#   handler call costs a dictionary hit instead of a boolean mask
+#   over every row of the export.
+#
+#   Built once per dataset snapshot (see data_loader), from the
+#   categorical codes of the compact table:
+#       exam → departments          (locations_for_exam, exam_at_site)
+#       department → exams          (exams_at_site)
+#       exam → visit lengths        (exam_duration)
+#       exam → rooms                (rooms_for_exam)
+#       (exam, location) → rooms    (rooms_for_exam_at_site)
+#
+#   Every list keeps the order the old pandas code produced
+#   (first appearance in the table, or sorted for rooms), so the
+#   answers do not change.
+# -------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+
+def _first_seen_pairs(a_codes: np.ndarray, b_codes: np.ndarray, b_size: int):
+    """
+    Return the distinct (a, b) code pairs (both non-missing) together
+    with the row where each pair first appears, in table order.
+    """
+    valid = (a_codes >= 0) & (b_codes >= 0)
+    rows = np.flatnonzero(valid)
+    keys = a_codes[valid].astype(np.int64) * b_size + b_codes[valid]
+
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+
+    first_rows = rows[first]
+    return a_codes[first_rows], b_codes[first_rows], first_rows
+
+
+class SchedulingIndex:
+    def __init__(self, df: pd.DataFrame, room_prefix_to_location: dict):
+        exam_col, dep_col = df["EAP Name"], df["DEP Name"]
+        room_col, length_col = df["Room Name"], df["Visit Type Length"]
+
+        exams = exam_col.cat.categories.tolist()
+        deps = dep_col.cat.categories.tolist()
+        rooms = room_col.cat.categories.tolist()
+        lengths = length_col.cat.categories.tolist()
+
+        exam_codes = exam_col.cat.codes.to_numpy()
+
+        # exam → departments, and department → exams (with first row seen)
+        self.exam_departments = {}
+        self.department_exams = {}
+        for e, d, row in zip(*_first_seen_pairs(exam_codes, dep_col.cat.codes.to_numpy(), len(deps))):
+            exam, dep = exams[e], deps[d]
+            self.exam_departments.setdefault(exam, []).append(dep)
+            self.department_exams.setdefault(dep, []).append((int(row), exam))
+
+        self._exam_department_sets = {
+            exam: frozenset(dep_list) for exam, dep_list in self.exam_departments.items()
+        }
+
+        # exam → visit lengths
+        self.exam_durations = {}
+        for e, l, _ in zip(*_first_seen_pairs(exam_codes, length_col.cat.codes.to_numpy(), len(lengths))):
+            self.exam_durations.setdefault(exams[e], []).append(lengths[l])
+
+        # exam → rooms (sorted, as rooms_for_exam returns them)
+        exam_rooms = {}
+        for e, r, _ in zip(*_first_seen_pairs(exam_codes, room_col.cat.codes.to_numpy(), len(rooms))):
+            exam_rooms.setdefault(exams[e], []).append(rooms[r])
+        self.exam_rooms = {exam: sorted(room_list) for exam, room_list in exam_rooms.items()}
+
+        # (exam, location) → rooms, using the inferred room prefixes
+        location_to_room_prefixes = {}
+        for room_prefix, location in room_prefix_to_location.items():
+            location_to_room_prefixes.setdefault(location, []).append(room_prefix)
+
+        room_locations = {}
+        for room in rooms:
+            room = str(room)
+            room_locations[room] = [
+                location
+                for location, prefixes in location_to_room_prefixes.items()
+                if any(room.startswith(p) for p in prefixes)
+            ]
+
+        self.exam_location_rooms = {}
+        for exam, room_list in self.exam_rooms.items():
+            for room in room_list:
+                for location in room_locations.get(room, []):
+                    self.exam_location_rooms.setdefault((exam, location), []).append(room)
+
+    # ---------------------------------------------------------
+    # Lookups used by query_handlers
+    # ---------------------------------------------------------
+    def departments_for_exam(self, exam: str) -> list:
+        return list(self.exam_departments.get(exam, []))
+
+    def exam_offered_at(self, exam: str, deps) -> bool:
+        offered = self._exam_department_sets.get(exam)
+        return bool(offered) and any(d in offered for d in deps)
+
+    def exams_for_departments(self, deps) -> list:
+        # Merge the per-department lists, ordering each exam by the first
+        # row it appears in across all of these departments.
+        first_row = {}
+        for dep in deps:
+            for row, exam in self.department_exams.get(dep, []):
+                if exam not in first_row or row < first_row[exam]:
+                    first_row[exam] = row
+        return sorted(first_row, key=first_row.get)
+
+    def durations_for_exam(self, exam: str) -> list:
+        return list(self.exam_durations.get(exam, []))
+
+    def rooms_for_exam(self, exam: str) -> list:
+        return list(self.exam_rooms.get(exam, []))
+
+    def rooms_for_exam_at_location(self, exam: str, location: str) -> list:
+        return list(self.exam_location_rooms.get((exam, location), []))
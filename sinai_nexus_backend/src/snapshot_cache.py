@@ -0,0 +1,210 @@
+# -------------------------------------------------------------
+# snapshot_cache.py
+# -------------------------------------------------------------
+# Purpose:
+#   Keep a local, content-addressed copy of the scheduling
+#   Parquet snapshot so a cold start does not have to wait on
+#   a full Supabase Storage download.
+#
+#   Layout of the cache directory (SCHEDULING_CACHE_DIR):
+#       <sha256>.parquet   → the snapshot bytes, named by content hash
+#       snapshot.json      → manifest: which hash is current + the
+#                            Storage ETag it was downloaded under
+#
+#   On startup we serve the cached bytes immediately and then
+#   revalidate in the background: we ask Storage for the object's
+#   metadata (cheap list call, no body) and only download the
+#   Parquet again when the ETag has changed.
+# -------------------------------------------------------------
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+BUCKET = "epic-scheduling"
+OBJECT_PATH = "Locations_Rooms/new_scheduling_clean.parquet"
+
+CACHE_DIR = os.getenv("SCHEDULING_CACHE_DIR", "data/cache")
+MANIFEST_NAME = "snapshot.json"
+
+
+def _manifest_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, MANIFEST_NAME)
+
+
+def _blob_path(cache_dir: str, sha256: str) -> str:
+    return os.path.join(cache_dir, f"{sha256}.parquet")
+
+
+def read_manifest(cache_dir: str = CACHE_DIR):
+    """Return the cache manifest dict, or None if there is no usable cache."""
+    try:
+        with open(_manifest_path(cache_dir)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if not manifest.get("sha256"):
+        return None
+    return manifest
+
+
+def read_cached_snapshot(cache_dir: str = CACHE_DIR):
+    """
+    Return (bytes, manifest) for the current cached snapshot, or None.
+
+    The blob is verified against its content hash so a truncated
+    write (e.g. the machine was stopped mid-download) is never served.
+    """
+    manifest = read_manifest(cache_dir)
+    if not manifest:
+        return None
+
+    try:
+        with open(_blob_path(cache_dir, manifest["sha256"]), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if hashlib.sha256(data).hexdigest() != manifest["sha256"]:
+        print("⚠️ Cached scheduling snapshot failed its hash check; ignoring it")
+        return None
+
+    return data, manifest
+
+
+def write_cached_snapshot(data: bytes, etag=None, cache_dir: str = CACHE_DIR) -> dict:
+    """
+    Store snapshot bytes under their content hash and point the
+    manifest at them. Both files are written to a temp name first and
+    then renamed, so readers only ever see a complete snapshot.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    blob_path = _blob_path(cache_dir, sha256)
+    if not os.path.exists(blob_path):
+        tmp = blob_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, blob_path)
+
+    previous = read_manifest(cache_dir)
+
+    manifest = {
+        "bucket": BUCKET,
+        "path": OBJECT_PATH,
+        "etag": etag,
+        "sha256": sha256,
+        "size": len(data),
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp = _manifest_path(cache_dir) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path(cache_dir))
+
+    # Drop the blob we just replaced so the cache holds one snapshot
+    if previous and previous["sha256"] != sha256:
+        try:
+            os.remove(_blob_path(cache_dir, previous["sha256"]))
+        except FileNotFoundError:
+            pass
+
+    return manifest
+
+
+def fetch_remote_etag(supabase):
+    """
+    Ask Storage for the snapshot's ETag without downloading it.
+    Returns None if Storage reports no ETag; raises if the metadata
+    call itself fails.
+    """
+    folder, name = OBJECT_PATH.rsplit("/", 1)
+    entries = supabase.storage.from_(BUCKET).list(folder, {"search": name})
+
+    for entry in entries or []:
+        if entry.get("name") == name:
+            return (entry.get("metadata") or {}).get("eTag")
+    return None
+
+
+def download_snapshot(supabase, cache_dir: str = CACHE_DIR, etag=None):
+    """Download the snapshot from Storage and store it in the cache."""
+    if etag is None:
+        try:
+            etag = fetch_remote_etag(supabase)
+        except Exception as e:
+            print("fetch_remote_etag error:", e)
+    data = supabase.storage.from_(BUCKET).download(OBJECT_PATH)
+    if not data:
+        raise Exception("Unable to download parquet from Supabase")
+
+    manifest = write_cached_snapshot(data, etag=etag, cache_dir=cache_dir)
+    return data, manifest
+
+
+def refresh_snapshot(supabase, cache_dir: str = CACHE_DIR):
+    """
+    Revalidate the cached snapshot against Storage.
+
+    Returns the new manifest if a different snapshot was downloaded,
+    otherwise None (cache already current, or Storage unreachable).
+    """
+    manifest = read_manifest(cache_dir)
+    try:
+        remote_etag = fetch_remote_etag(supabase)
+    except Exception as e:
+        # Storage unreachable: keep serving the cache, try again next time
+        print("fetch_remote_etag error:", e)
+        return None
+
+    # Same ETag → nothing to download
+    if manifest and remote_etag and manifest.get("etag") == remote_etag:
+        return None
+
+    try:
+        data, new_manifest = download_snapshot(supabase, cache_dir, etag=remote_etag)
+    except Exception as e:
+        print("refresh_snapshot error:", e)
+        return None
+
+    # Storage may not report an ETag; the content hash still tells us
+    # whether the bytes actually changed.
+    if manifest and manifest["sha256"] == new_manifest["sha256"]:
+        return None
+
+    return new_manifest
+
+
+def load_snapshot_bytes(supabase, cache_dir: str = CACHE_DIR, on_refresh=None):
+    """
+    Return (bytes, manifest) for the scheduling snapshot.
+
+    - Cache hit  → return the local copy right away and revalidate it
+                   on a background thread. `on_refresh(manifest)` is
+                   called if a newer snapshot was downloaded.
+    - Cache miss → download synchronously (first boot on a fresh disk).
+    """
+    cached = read_cached_snapshot(cache_dir)
+    if cached is None:
+        print("📥 No cached scheduling snapshot; downloading from Supabase")
+        return download_snapshot(supabase, cache_dir)
+
+    data, manifest = cached
+    print(f"⚡ Using cached scheduling snapshot {manifest['sha256'][:12]} "
+          f"(fetched {manifest.get('fetched_at')})")
+
+    def _revalidate():
+        new_manifest = refresh_snapshot(supabase, cache_dir)
+        if new_manifest is None:
+            return
+        print(f"🔄 Newer scheduling snapshot cached: {new_manifest['sha256'][:12]}")
+        if on_refresh:
+            on_refresh(new_manifest)
+
+    threading.Thread(target=_revalidate, name="snapshot-revalidate", daemon=True).start()
+
+    return data, manifest
@@ -0,0 +1,407 @@
+# -------------------------------------------------------------
+# vector_index.py
+# -------------------------------------------------------------
+# Purpose:
+#   In-process mirror of the Supabase `documents` table for /rag-chat.
+#   Instead of a network RPC to `match_documents` per question, all
+#   chunk embeddings live in RAM as one matrix and a search is a
+#   single dot product per row. By default the matrix is int8 with
+#   per-row scales (~390 bytes per chunk instead of ~1.5 KB float32)
+#   and the top candidates are re-ranked with their exact float rows;
+#   see int8_store.py and VECTOR_INDEX_STORAGE / VECTOR_INDEX_RERANK.
+#
+#   search() reproduces what rag_chat did with the RPC result:
+#     1) cosine distance to every chunk (one int8 / BLAS dot product,
+#        exact distances for the re-ranked candidates)
+#     2) the `match_count` nearest chunks, expired notes excluded
+#        (those are purged from the table anyway)
+#     3) inactive notes dropped (start_date / end_date vs today)
+#     4) priority weighting (notes 0.3, priority 2 0.7, rest 1.0)
+#        and a stable sort on the weighted score
+#   all vectorized in the same pass; only the returned rows become dicts.
+#
+#   The BM25 index (lexical_index.py) is maintained alongside: built
+#   from the same rows on every full load and updated by the same
+#   add_rows / remove_files calls; lexical_search() queries it.
+#
+#   Lifecycle:
+#     vector_index.start_background_load(client)  # on startup
+#     vector_index.add_rows(rows)                 # after /upload inserts
+#     vector_index.remove_files(path, ...)        # after /delete-file
+#     vector_index.start_watcher(interval)        # periodic full resync
+#
+#   Until the first load finishes (or if it fails) search() returns
+#   None and the caller falls back to the RPC.
+# -------------------------------------------------------------
+
+import os
+import json
+import time
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from src.lexical_index import BM25Index, row_key
+from src.int8_store import make_vectors
+
+# "int8" (compact, default) or "float32" (exact, 4x the memory)
+VECTOR_INDEX_STORAGE = os.getenv("VECTOR_INDEX_STORAGE", "int8")
+# Recompute exact float distances for the top int8 candidates
+VECTOR_INDEX_RERANK = os.getenv("VECTOR_INDEX_RERANK", "true").lower() == "true"
+# Candidates re-ranked per query: max(factor × match_count, minimum)
+VECTOR_INDEX_RERANK_FACTOR = int(os.getenv("VECTOR_INDEX_RERANK_FACTOR", "4"))
+VECTOR_INDEX_RERANK_MIN = int(os.getenv("VECTOR_INDEX_RERANK_MIN", "64"))
+# Where the float rows for re-ranking are memory-mapped ("" → keep in RAM)
+VECTOR_INDEX_SPILL_DIR = os.getenv(
+    "VECTOR_INDEX_SPILL_DIR", os.getenv("SCHEDULING_CACHE_DIR", "data/cache")
+)
+# Float rows of uploads kept in RAM before they are moved to a new spill file
+VECTOR_INDEX_SPILL_TAIL_MB = float(os.getenv("VECTOR_INDEX_SPILL_TAIL_MB", "32"))
+
+_COLUMNS = "id, content, file_path, priority, start_date, end_date, location, embedding"
+_PAGE_SIZE = 1000
+
+# Missing dates compare as "always started" / "never ends"
+_NO_START = ""
+_NO_END = "9999-12-31"
+
+# Same weights rag_chat applies to the RPC distances
+_PRIORITY_WEIGHTS = {1: 0.3, 2: 0.7}
+
+
+class _IndexData(NamedTuple):
+    """One immutable version of the index; swapped, never mutated."""
+    vectors: object          # (n, dim) unit rows: Int8Vectors or FloatVectors
+    weights: np.ndarray      # (n,) float32 priority weight
+    is_note: np.ndarray      # (n,) bool, priority == 1
+    start: np.ndarray        # (n,) "YYYY-MM-DD" or _NO_START
+    end: np.ndarray          # (n,) "YYYY-MM-DD" or _NO_END
+    rows: list               # (n,) row dicts without the embedding
+
+    @property
+    def memory_mb(self) -> float:
+        return round(self.vectors.nbytes / 1e6, 2)
+
+
+def _parse_embedding(value) -> list:
+    # pgvector columns come back as the text "[0.1,0.2,...]"
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _parse_rows(rows: list, dim: int = None):
+    """Row metadata (without the embedding) and the unit-norm float32 matrix."""
+    metas, vectors = [], []
+    for row in rows:
+        vec = _parse_embedding(row.get("embedding"))
+        if not vec:
+            continue
+        meta = {k: v for k, v in row.items() if k != "embedding"}
+        if meta.get("priority") is None:
+            meta["priority"] = 3
+        metas.append(meta)
+        vectors.append(vec)
+
+    if vectors:
+        emb = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(emb, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        emb /= norms
+    else:
+        emb = np.zeros((0, dim or 384), dtype=np.float32)
+    return metas, emb
+
+
+def _build(metas: list, vectors) -> _IndexData:
+    priority = np.array([m["priority"] for m in metas], dtype=np.int16)
+    return _IndexData(
+        vectors=vectors,
+        weights=np.array([_PRIORITY_WEIGHTS.get(p, 1.0) for p in priority], dtype=np.float32),
+        is_note=priority == 1,
+        start=np.array([m.get("start_date") or _NO_START for m in metas], dtype="U10"),
+        end=np.array([m.get("end_date") or _NO_END for m in metas], dtype="U10"),
+        rows=metas,
+    )
+
+
+def _concat(a: _IndexData, b: _IndexData) -> _IndexData:
+    return _IndexData(
+        vectors=b.vectors,
+        weights=np.concatenate([a.weights, b.weights]),
+        is_note=np.concatenate([a.is_note, b.is_note]),
+        start=np.concatenate([a.start, b.start]),
+        end=np.concatenate([a.end, b.end]),
+        rows=a.rows + b.rows,
+    )
+
+
+def _select(data: _IndexData, keep: np.ndarray) -> _IndexData:
+    return _IndexData(
+        vectors=data.vectors.select(keep),
+        weights=data.weights[keep],
+        is_note=data.is_note[keep],
+        start=data.start[keep],
+        end=data.end[keep],
+        rows=[row for row, k in zip(data.rows, keep) if k],
+    )
+
+
+def fetch_all_documents(client) -> list:
+    """Page through the whole `documents` table."""
+    rows, offset = [], 0
+    while True:
+        page = (
+            client.table("documents")
+            .select(_COLUMNS)
+            .range(offset, offset + _PAGE_SIZE - 1)
+            .execute()
+        ).data or []
+        rows.extend(page)
+        if len(page) < _PAGE_SIZE:
+            return rows
+        offset += _PAGE_SIZE
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        fetch=fetch_all_documents,
+        storage: str = VECTOR_INDEX_STORAGE,
+        rerank: bool = VECTOR_INDEX_RERANK,
+        spill_dir: str = VECTOR_INDEX_SPILL_DIR,
+    ):
+        self._fetch = fetch
+        self.storage = storage
+        self.rerank = rerank
+        self.spill_dir = spill_dir
+        self._data = None
+        self._lexical = None
+        self._state = "idle"
+        self._error = None
+        self._load_seconds = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._watcher = None
+
+        # Incremental changes made while a full load is in flight are
+        # replayed on top of its result, so none are lost in the swap.
+        self._loading = False
+        self._pending = []
+
+        self.searches = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self._data is not None
+
+    # ---------- loading ----------
+    def load(self, client) -> bool:
+        """Fetch the whole table and swap it in. Returns False on failure."""
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = True
+            self._pending = []
+            if self._data is None:
+                self._state = "loading"
+
+        started = time.perf_counter()
+        try:
+            rows = self._fetch(client)
+            metas, matrix = _parse_rows(rows)
+            vectors = make_vectors(
+                matrix, self.storage, self.rerank, self.spill_dir, int(VECTOR_INDEX_SPILL_TAIL_MB * 1e6)
+            )
+            data = _build(metas, vectors)
+            del matrix
+            lexical = BM25Index(rows)
+        except Exception as e:
+            print("❌ Vector index load failed:", e)
+            with self._lock:
+                self._loading = False
+                self._error = str(e)
+                if self._data is None:
+                    self._state = "error"
+            return False
+
+        with self._lock:
+            for op, arg in self._pending:
+                data = op(data, lexical, arg)
+            self._pending = []
+            self._data = data
+            self._lexical = lexical
+            self._loading = False
+            self._state = "ready"
+            self._error = None
+            self._load_seconds = round(time.perf_counter() - started, 3)
+            self._loaded_at = time.time()
+        print(
+            f"✅ Vector index ready ({len(data.rows)} chunks, {data.memory_mb} MB, "
+            f"{lexical.terms} BM25 terms, {self._load_seconds}s)"
+        )
+        return True
+
+    def start_background_load(self, client):
+        threading.Thread(target=self.load, args=(client,), name="vector-index-load", daemon=True).start()
+
+    def start_watcher(self, client, interval_seconds: float):
+        """Full resync every `interval_seconds`, for writes made outside this process."""
+        if interval_seconds <= 0 or self._watcher is not None:
+            return
+
+        def _watch():
+            while True:
+                time.sleep(interval_seconds)
+                self.load(client)
+
+        self._watcher = threading.Thread(target=_watch, name="vector-index-watcher", daemon=True)
+        self._watcher.start()
+
+    # ---------- incremental sync ----------
+    # Each op returns the new vector data and updates the BM25 index in place
+    @staticmethod
+    def _add(data: _IndexData, lexical: BM25Index, rows: list) -> _IndexData:
+        # Rows already indexed are skipped: an add replayed after a load
+        # may find them in the freshly fetched table (BM25 replaces by
+        # the same key, so both sides keep one copy)
+        seen = {row_key(row) for row in data.rows}
+        new_rows = []
+        for row in rows:
+            key = row_key(row)
+            if key not in seen:
+                seen.add(key)
+                new_rows.append(row)
+        if not new_rows:
+            return data
+
+        # Vector side first: BM25 is updated in place, so it only follows
+        # once the new vector data exists and the two cannot diverge
+        metas, matrix = _parse_rows(new_rows, data.vectors.dim)
+        added = _concat(data, _build(metas, data.vectors.extend(matrix)))
+        lexical.add_rows(new_rows)
+        return added
+
+    @staticmethod
+    def _remove(data: _IndexData, lexical: BM25Index, paths: set) -> _IndexData:
+        keep = np.array([row.get("file_path") not in paths for row in data.rows], dtype=bool)
+        remaining = data if keep.all() else _select(data, keep)
+        lexical.remove_files(paths)
+        return remaining
+
+    def _apply(self, op, arg):
+        with self._lock:
+            if self._data is not None:
+                self._data = op(self._data, self._lexical, arg)
+            # Queued only once it applied cleanly, so a failing op
+            # cannot break the replay at the end of a load
+            if self._loading:
+                self._pending.append((op, arg))
+
+    def add_rows(self, rows: list):
+        """Mirror freshly inserted `documents` rows (with their embeddings)."""
+        if rows:
+            self._apply(self._add, rows)
+
+    def remove_files(self, *file_paths):
+        """Mirror a delete of every chunk of these file paths."""
+        paths = {p for p in file_paths if p}
+        if paths:
+            self._apply(self._remove, paths)
+
+    # ---------- search ----------
+    def _nearest(self, data: _IndexData, query_embedding, match_count: int, today: str):
+        """
+        Indices of the `match_count` nearest chunks, nearest first, with
+        inactive notes removed, plus the distance array.
+        """
+        n = len(data.rows)
+
+        q = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+
+        vectors = data.vectors
+        distance = 1.0 - vectors.similarity(q)
+
+        # Expired notes are deleted from the table by the purge, so they
+        # never take one of the match_count slots
+        expired = data.is_note & (data.end < today)
+        distance[expired] = np.inf
+
+        valid = n - int(expired.sum())
+        k = min(match_count, valid)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), distance
+
+        if vectors.approximate and vectors.can_rerank:
+            # Exact float distances for the best int8 candidates, then
+            # pick the match_count nearest among them
+            c = min(max(k * VECTOR_INDEX_RERANK_FACTOR, VECTOR_INDEX_RERANK_MIN), valid)
+            candidates = np.argpartition(distance, c - 1)[:c] if c < n else np.arange(n)
+            distance[candidates] = 1.0 - vectors.exact_similarity(candidates, q)
+            nearest = candidates[np.argsort(distance[candidates], kind="stable")[:k]]
+        else:
+            nearest = np.argpartition(distance, k - 1)[:k] if k < n else np.arange(n)
+            nearest = nearest[np.argsort(distance[nearest], kind="stable")]
+
+        # Active-note filter on the candidates
+        active = ~data.is_note[nearest] | (data.start[nearest] <= today)
+        return nearest[active], distance
+
+    def nearest(self, query_embedding, match_count: int, today: str):
+        """
+        Nearest chunks by cosine "distance" (what the RPC returns, inactive
+        notes removed), without priority weighting. None if not loaded.
+        """
+        data = self._data
+        if data is None:
+            return None
+        self.searches += 1
+        nearest, distance = self._nearest(data, query_embedding, match_count, today)
+        return [dict(data.rows[i], distance=float(distance[i])) for i in nearest]
+
+    def search(self, query_embedding, match_count: int, today: str):
+        """
+        Rows ranked the way rag_chat ranks RPC results (weighted score,
+        inactive notes removed), each with its cosine "distance".
+        None if the index is not loaded.
+        """
+        data = self._data
+        if data is None:
+            return None
+        self.searches += 1
+        nearest, distance = self._nearest(data, query_embedding, match_count, today)
+
+        # Priority weighting on the candidates
+        scores = distance[nearest] * data.weights[nearest]
+        ranked = nearest[np.argsort(scores, kind="stable")]
+
+        return [dict(data.rows[i], distance=float(distance[i])) for i in ranked]
+
+    def lexical_search(self, query: str, k: int, today: str):
+        """Top-k chunks by BM25 (see lexical_index.py). None if not loaded."""
+        lexical = self._lexical
+        if lexical is None:
+            return None
+        return lexical.search(query, k, today)
+
+    def status(self) -> dict:
+        data = self._data
+        return {
+            "state": self._state,
+            "ready": data is not None,
+            "chunks": len(data.rows) if data else None,
+            "storage": self.storage,
+            "rerank": bool(data and data.vectors.can_rerank),
+            "memory_mb": data.memory_mb if data else None,
+            "spill_mb": round(data.vectors.spill_bytes / 1e6, 2) if data else None,
+            "bm25_terms": self._lexical.terms if self._lexical else None,
+            "load_seconds": self._load_seconds,
+            "loaded_at": self._loaded_at,
+            "error": self._error,
+            "searches": self.searches,
+        }
+
+
+vector_index = VectorIndex()